@@ -2,59 +2,213 @@
 Merge Sort Visualizer - Interactive Tool
 This application demonstrates the merge sort 
 algorithm with step by step visualization
+(the sort engines themselves live in the merge_sort package)
 Author: Jannah Sultan
 Date: 9th December 2025
 """
-import random
-import gradio as gr
-import plotly.graph_objects as go
+from __future__ import annotations # annotations like gr.Request are only looked at once the UI runs
+
+import asyncio
+import cProfile
+import importlib
+import io
+import os
+import pstats
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from merge_sort.arrays import format_array_preview
+from merge_sort.cache import cache_stats, cached_trace, step_message, step_plot
+from merge_sort.data_sources import DATA_SOURCES, RAW_DTYPES, load_array
+from merge_sort.engines import KWAY_MERGE_WAYS
+from merge_sort.export import EXPORT_FORMAT_LABELS, available_export_formats, export_animation
+from merge_sort.external import EXTERNAL_SORT_MEMORY_BUDGET, external_step_message, sort_file_steps
+from merge_sort.generate import generate_values, new_seed
+from merge_sort.metrics import METRICS
+from merge_sort.trace import StepCursor
+
+# --------------------------------------------------------------------------------------------------
+# LAZY GRADIO IMPORT
+# --------------------------------------------------------------------------------------------------
+
+class LazyModule:
+    """
+    This class stands in for a module that is only imported when one of its
+    attributes is first used. importlib.import_module is safe to call from
+    several threads at once (Gradio runs handlers in threads), and once the
+    module is loaded it only looks it up in sys.modules.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, attribute):
+        return getattr(importlib.import_module(self.name), attribute)
+
+
+# Gradio takes seconds to import, so it is loaded the first time a handler or the UI uses it. Importing
+# this file stays fast, which matters for the parallel engine's worker processes: they import the
+# started script again (see worker_context in merge_sort/parallel.py).
+gr = LazyModule("gradio")
 
 # --------------------------------------------------------------------------------------------------
 # GLOBAL CONSTANTS
 # --------------------------------------------------------------------------------------------------
 
-MAX_ARRAY_LENGTH = 50
+MAX_ARRAY_LENGTH = 100_000
 MIN_ARRAY_LENGTH = 1
 SMALL_ARRAY_MAX_VALUE = 30
 LARGE_ARRAY_MAX_VALUE = 100
 
+QUEUE_CONCURRENCY_LIMIT = 16 # how many events the queue may process at the same time
+
+PLAY_DEFAULT_STEPS_PER_SECOND = 3  # starting speed of the Play button
+PLAY_MAX_STEPS_PER_SECOND = 1_000  # fastest speed the speed slider allows
+PLAY_MAX_FRAMES_PER_SECOND = 20    # Play never sends more plots than this per second; faster speeds skip steps
+
+PROFILE_REPORT_LINES = 30 # functions listed in a session's profile report
+
+DOWNLOAD_CACHE_SECONDS = 3600 # Gradio deletes its copies of sorted files and animations after about this long
+
 # --------------------------------------------------------------------------------------------------
-# GLOBAL STATE
+# SESSION PROFILING AND STATS PANEL
 # --------------------------------------------------------------------------------------------------
 
-unsorted_array = [] # stores the current unsorted array being worked on
+PROFILERS = {} # session hash -> (cProfile.Profile, lock) for sessions that turned profiling on
+
+
+@contextmanager
+def session_profile(request):
+    """
+    This context manager runs its body under the session's profiler when the
+    session has turned profiling on. A click that arrives while another click
+    of the same session is being profiled is simply not profiled.
+    
+    Args:
+        request (gr.Request or None): The request of the click being handled
+    """
+
+    entry = PROFILERS.get(request.session_hash) if request is not None else None
+    if entry is None or not entry[1].acquire(blocking=False):
+        yield
+        return
+
+    profiler, lock = entry
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        lock.release()
+
+
+def toggle_profiling(enabled, request: gr.Request):
+    """
+    This function is called when the user ticks or unticks "Profile my clicks".
+    Ticking starts a cProfile profiler for this session only; unticking stops
+    it and shows where the time went.
+    
+    Args:
+        enabled (bool): Whether the checkbox is ticked
+        request (gr.Request): The session's request
+        
+    Returns:
+        str: Text for the profile report textbox
+    """
+
+    if enabled:
+        PROFILERS[request.session_hash] = (cProfile.Profile(), threading.Lock())
+        return "⏱️ Profiling your clicks on 'Start Sorting' and 'Next Step'... untick the box to see the report."
+
+    entry = PROFILERS.pop(request.session_hash, None)
+    if entry is None:
+        return ""
+    profiler, lock = entry
+    with lock: # wait for a click that is still being profiled
+        report = io.StringIO()
+        try:
+            pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(PROFILE_REPORT_LINES)
+        except TypeError: # no profiled clicks yet, so there are no stats to print
+            return "No clicks were profiled."
+    return report.getvalue()
+
+
+def forget_session(request: gr.Request):
+    """
+    Forgets the session's profiler and pending step clicks when its browser tab is closed.
+    """
+
+    PROFILERS.pop(request.session_hash, None)
+    SESSION_CLICKS.pop(request.session_hash, None)
+
+
+def refresh_stats():
+    """
+    This function is called when the user clicks "Refresh" in the stats panel.
+    
+    Returns:
+        tuple: (rows for the stats table, metrics in Prometheus text format)
+    """
+
+    rows = METRICS.rows()
+    lines = [
+        "# HELP merge_sort_cache_lookups_total Trace and plot cache lookups, by result.",
+        "# TYPE merge_sort_cache_lookups_total counter",
+    ]
+    for name, stats in cache_stats().items():
+        rows.append([f"{name} cache hits", stats["hits"], None, None, None])
+        rows.append([f"{name} cache misses", stats["misses"], None, None, None])
+        for result, count in (("hit", stats["hits"]), ("miss", stats["misses"])):
+            lines.append(f'merge_sort_cache_lookups_total{{cache="{name}",result="{result}"}} {count}')
+    return rows, METRICS.prometheus_text() + "\n".join(lines) + "\n"
+
+
+def reset_stats():
+    """
+    This function is called when the user clicks "Reset" in the stats panel.
+    """
+
+    METRICS.reset()
+    return refresh_stats()
 
 # --------------------------------------------------------------------------------------------------
 # ARRAY GENERATION FUNCTION
 # --------------------------------------------------------------------------------------------------
 
-def generate_random_array(length_input):
+def generate_random_array(length_input, distribution="uniform", seed=None):
     """
     This function validates the user's input, generates an array of random 
     integers, and updates the UI state to enable the sorting button.
     
     Args:
         length_input (str or int):The desired length of the array from the user input
+        distribution (str): Key in VALUE_DISTRIBUTIONS (uniform, sorted, zipf...)
+        seed (int or None): Seed of the random numbers (None picks a new one)
     Returns:
-        tuple: A 4-element tuple containing:
+        tuple: A 6-element tuple containing:
+               - list: the generated array stored in this session's array state
                - str or list: an error message or the generated array
                - gr.update: a button state update for the 'generate' button
                - gr.update: a textbox state update for the length input
                - gr.update: a button state update for the 'start sorting' button
+               - gr.update: the seed that was used, so the same array can be made again
                
     Raises:
         ValueError: If input cannot be converted to integer
     """
-    
-    unsorted_array.clear() #clear any previously generated array
 
     # VALIDATION 1: Check for empty input
     if not length_input or str(length_input).strip() == "":
         return (
+            [],
             "⚠️ Please enter a number!", 
             gr.update(), #keep generate button as-is
             gr.update(), #keep input textbox as-is
-            gr.update()  #keep start button as-is
+            gr.update(), #keep start button as-is
+            gr.update(), #keep seed as-is
         )
 
     # VALIDATION 2: Try to convert input to integer
@@ -62,293 +216,395 @@ def generate_random_array(length_input):
         length_input_txtbox = int(length_input)
     except ValueError:
         return (
+            [],
             "❌ Please enter a valid integer!",
             gr.update(), #generate button
             gr.update(), #length input
             gr.update(), #start sorting button
+            gr.update(), #seed
         )
         
     # VALIDATION 3: Check if length input is positive
     if length_input_txtbox <= 0:
         return (
+            [],
             "❌ Array length must be positive!", 
             gr.update(), #generate button
             gr.update(), #length input
             gr.update(), #start sorting button
+            gr.update(), #seed
         )
             
     # VALIDATION 4: Check if length input exceeds maximum
     if length_input_txtbox > MAX_ARRAY_LENGTH:
         return (
+            [],
             f"❌ Array length cannot exceed {MAX_ARRAY_LENGTH}!",
             gr.update(), #generate button
             gr.update(), #length input
             gr.update(), #start sorting button
+            gr.update(), #seed
         )
 
-    # Generate random array based on input (for array size)
-    for _ in range(length_input_txtbox):
-        if length_input_txtbox < 50: # smaller arrays get smaller values for better visualization
-            max_value = SMALL_ARRAY_MAX_VALUE
-        else:
-            max_value = LARGE_ARRAY_MAX_VALUE
-        unsorted_array.append(random.randint(1, max_value))
+    # Generate random array based on input (for array size), all at once from the seed
+    if length_input_txtbox < 50: # smaller arrays get smaller values for better visualization
+        max_value = SMALL_ARRAY_MAX_VALUE
+    else:
+        max_value = LARGE_ARRAY_MAX_VALUE
+    if seed is None:
+        seed = new_seed()
+    seed = int(seed)
+    # every call builds a fresh list, so sessions never share one
+    unsorted_array = generate_values(length_input_txtbox, seed, distribution, high=max_value).tolist()
 
     # Return the array and update UI states
     return (
-        unsorted_array,                  # display the generated array in the array display output textbox
+        unsorted_array,                  # store the array in this session's state
+        format_array_preview(unsorted_array), # display the generated array in the array display output textbox
         gr.update(interactive=False),    # disable generate_btn
         gr.update(interactive=False),    # disable length textbox
         gr.update(interactive=True),     # enable start_sorting_btn
+        gr.update(value=seed),           # show the seed used
     )
 
 # --------------------------------------------------------------------------------------------------
-# MERGE SORT ALGORITHM WITH STEP-BY-STEP VISUALIZATION
+# LOADING AND SORTING UPLOADED FILES
 # --------------------------------------------------------------------------------------------------
 
-def visualize_merge_sort_steps(arr):
+def load_data_file(file_path, column, dtype):
     """
-    This generator function implements merge sort while yielding visualization 
-    data at each significant step (such as splitting, comparing, and merging).
+    This function is called when the user clicks "Load Data". It loads the
+    uploaded file and updates the UI the same way generating an array does.
     
     Args:
-        arr (list): List of integers to sort
+        file_path (str or None): Path of the uploaded file
+        column (str): Column to sort (blank for the first numeric one)
+        dtype (str): Number type for raw binary files
         
-    Yields:
-        tuple: A 4-element tuple for each step:
-            - str: Step type (currently always "display")
-            - str: Human-readable message explaining current step
-            - list: Current state of the full array
-            - tuple: (start_index, end_index) indicating highlighted section
     Returns:
-        list: The fully sorted array (returned via StopIteration)
+        tuple: The first 5 values generate_random_array returns
     """
-    
-    full_array = arr.copy() # create a copy of the array to track changes throughout sorting
 
-    def sort(arr, offset=0, counter=0):
-        """
-        This is the main recursive function that divides the array into halves,
-        sorts each half, and then merges them back together.
-        
-        Args:
-            arr (list): The sub-array to sort
-            offset (int): Starting index of this sub-array in the full array
-            counter (int): Current recursion depth (for messaging personalization)
-            
-        Yields:
-            tuple: Visualization data for each step
-            
-        Returns:
-            list: The sorted sub-array
-        """
-
-    # BASE CASE: Arrays with 0 or 1 element are already sorted
-        if len(arr) < 2:
-            yield (
-                "display",
-                "✨ There is only 1 element in this half, so it's already sorted and perfect!",
-                full_array,
-                (offset, offset + len(arr) - 1),
-            )
-            return arr
+    # VALIDATION 1: Check that a file was uploaded
+    if not file_path:
+        return (
+            [],
+            "⚠️ Please upload a file first!",
+            gr.update(), #generate button
+            gr.update(), #length input
+            gr.update(), #start sorting button
+        )
 
-    # DIVIDE STEP: Split array into two halves
-        mid = len(arr) // 2   # Find the middle index
-        left = arr[:mid]      # Left half (start to middle)
-        right = arr[mid:]     # Right half (middle to end)
+    # VALIDATION 2: Try to read the file
+    try:
+        values = load_array(file_path, column.strip() if column else None, dtype)
+    except (ImportError, ValueError, OSError, KeyError, IndexError) as e:
+        return (
+            [],
+            f"❌ Could not load the file: {e}",
+            gr.update(), #generate button
+            gr.update(), #length input
+            gr.update(), #start sorting button
+        )
 
-        # Generate descriptive text for the split
-        split_text = "next " if counter != 0 else "" #if splitting second half, add "next" to existing sentence for better UX
-        yield (
-            "display",
-            f"🔪 CHOP! Splitting the {split_text}array in half...\n"
-            f"        📦 Left half consists of: {left}\n"
-            f"        📦 Right half consists of: {right}",
-            full_array,
-            (offset, offset + len(arr) - 1), #highlight the section being split
+    # VALIDATION 3: Check the number of values
+    if not MIN_ARRAY_LENGTH <= len(values) <= MAX_ARRAY_LENGTH:
+        return (
+            [],
+            f"❌ The file has {len(values)} values, but only {MIN_ARRAY_LENGTH} to {MAX_ARRAY_LENGTH} can be sorted "
+            "step by step! Use 'Sort File on Disk' to sort it without the visualization.",
+            gr.update(), #generate button
+            gr.update(), #length input
+            gr.update(), #start sorting button
         )
 
-    # CONQUER STEP: Recursively sort both halves by repeatedly splitting them again until base case is reached
-        counter += 1
-        left_sorted = yield from sort(left, offset, counter)
-        right_sorted = yield from sort(right, offset + mid, counter)
+    return (
+        values,                          # store the array in this session's state
+        format_array_preview(values),    # display the loaded array in the array display output textbox
+        gr.update(interactive=False),    # disable generate_btn
+        gr.update(interactive=False),    # disable length textbox
+        gr.update(interactive=True),     # enable start_sorting_btn
+    )
 
-    # COMBINE STEP: Merge the two sorted halves
-        result = yield from merge(left_sorted, right_sorted, offset)
 
-        # Update the full array with the merged result
-        for i, val in enumerate(result):
-            full_array[offset + i] = val
-            
-        return result
-
-    def merge(left, right, offset):
-        """
-        This function takes two sorted sub-arrays and combines them into 
-        a single sorted array by comparing elements from each side.
-        Args:
-            left (list): First sorted sub-array
-            right (list): Second sorted sub-array
-            offset (int): Starting position in the full array
-            
-        Yields:
-            tuple: Visualization data showing the merge process
-            
-        Returns:
-            list: The merged and sorted array
-        """
+@contextmanager
+def download_folder():
+    """
+    This context manager makes a temporary folder for a file the user can
+    download, and deletes it again when the with block ends. Gradio copies
+    every file it sends into its own cache (cleaned up after
+    DOWNLOAD_CACHE_SECONDS), so the original is not needed once the update
+    offering it has been yielded, nor when the user stops the handler early.
+    
+    Yields:
+        str: Path of the folder
+    """
+
+    folder = tempfile.mkdtemp(prefix="merge_sort_")
+    try:
+        yield folder
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def sort_file_on_disk(file_path, column, dtype, memory_budget_mb):
+    """
+    This generator function is called when the user clicks "Sort File on Disk".
+    It sorts the uploaded file with sort_file_steps, streaming each
+    progress step to the UI, and offers the sorted .npy file for download.
+    
+    Args:
+        file_path (str or None): Path of the uploaded file
+        column (str): Column to sort (blank for the first numeric one)
+        dtype (str): Number type for raw binary files
+        memory_budget_mb (float): Memory budget in megabytes
         
-        result = [] # will hold the merged, sorted array
-        left_idx = right_idx = 0   # pointers for the left and right arrays respectively
-
-        comparison_text = "Based on the comparison, "
-
-     # MERGE PROCESS: Compare elements from left and right arrays
-        while left_idx < len(left) and right_idx < len(right):
-            # compare current elements from both arrays
-            if left[left_idx] <= right[right_idx]:
-                # if left element is smaller or equal to right, add it to result
-                result.append(left[left_idx])
-                comparison_text += (
-                    f"\n Comparing {left[left_idx]} and {right[right_idx]}, "
-                    f"I added {left[left_idx]} from left half, "
-                )
-                left_idx += 1
-            else:
-                #  if right element is smaller, add it to result
-                result.append(right[right_idx])
-                comparison_text += (
-                    f"\n Comparing {left[left_idx]} and {right[right_idx]}, "
-                    f"I added {right[right_idx]} from right half, "
-                )
-                right_idx += 1
-                
-    #  CLEANUP: Add any remaining elements in the left and right arrays
-        result.extend(left[left_idx:])
-        result.extend(right[right_idx:])
+    Yields:
+        tuple: (progress message, gr.update for the download file)
+    """
 
-        comparison_text += (
-            f"(all to the start of the sorted array) and added the remaining at the end "
-            f"so that the final array for this half is {result}"
-        )
+    # VALIDATION: Check that a file was uploaded
+    if not file_path:
+        yield "⚠️ Please upload a file first!", gr.update()
+        return
+
+    memory_budget = max(1, int((memory_budget_mb or 1) * 2**20))
+    column = column.strip() if column else None
+    with download_folder() as folder:
+        output_path = os.path.join(folder, os.path.splitext(os.path.basename(file_path))[0] + "_sorted.npy")
+
+        # Only memory-mapped formats know their length up front
+        length = None
+        if os.path.splitext(file_path)[1].lower() in (".npy", ".bin", ".raw"):
+            try:
+                length = len(load_array(file_path, column, dtype))
+            except (ImportError, ValueError, OSError, IndexError) as e:
+                yield f"❌ Could not load the file: {e}", gr.update()
+                return
+
+        stepper = sort_file_steps(file_path, output_path, column, dtype, memory_budget)
+        try:
+            while True:
+                try:
+                    step = next(stepper)
+                except StopIteration as e:
+                    length = e.value
+                    break
+                yield external_step_message(step, length), gr.update()
+        except ImportError as e: # a reader this file type needs (e.g. pyarrow for Parquet) is not installed
+            yield f"❌ Could not load the file: {e}", gr.update()
+            return
+        except (ValueError, OSError, KeyError, IndexError) as e:
+            yield f"❌ Could not sort the file: {e}", gr.update()
+            return
 
-        #  Yeild the merge step visualization
         yield (
-            "display",
-            f"🤔 Comparing and merging left: {left} and right: {right}...\n{comparison_text}",
-            full_array,
-            (offset, offset + len(left) + len(right) - 1),
+            f"🏆 Sorted all {length} values! Download the result below (a NumPy .npy file).",
+            gr.update(value=output_path, visible=True),
         )
 
-        return result
+# --------------------------------------------------------------------------------------------------
+# UI CONTROL FUNCTIONS
+# --------------------------------------------------------------------------------------------------
+
+PROGRESS_LABEL = "What's going on now?"
 
-    #  Start the sorting process from the root
-    yield from sort(full_array, 0)
-    return full_array
+INTRO_MESSAGE = (
+    "Here is a graphical representation of the unsorted array.\n"
+    "Click 'Next Step' to begin sorting the bars!"
+)
 
-#  --------------------------------------------------------------------------------------------------
-#  VISUALIZATION (BAR PLOT) FUNCTION
-#  --------------------------------------------------------------------------------------------------
 
-def create_bar_plot(arr, highlight_range=None, finished=False):
+def show_position(stepper):
     """
-    This function generates a Plotly bar chart where different sections
-    can be highlighted with different colors to show the sorting process.
+    This function builds the message, plot and button states for wherever
+    the stepper currently is (the unsorted array, a step, or the final result).
     
     Args:
-        arr (list): The array to visualize
-        highlight_range (tuple, optional): (start, end) indices to highlight
-        finished (bool): Whether sorting is complete
+        stepper (StepCursor): The session's position inside the step trace
         
     Returns:
-        plotly.graph_objects.Figure: The configured bar chart
+        tuple: Updated state values for all UI components:
+            - StepCursor: Updated stepper state
+            - gr.update: progress_txtbox message and step counter
+            - FastFigure: Updated plot
+            - gr.update: Next step button state
+            - gr.update: Reset button state
     """
 
-   #  Determine colors for each bar based on highlighting 
-    if highlight_range:
-        start, end = highlight_range
-        mid = start + (end - start + 1) // 2 #  Calculate midpoint
+    if stepper.finished:
+        # Sorting is finished - show the final array
+        final_array = stepper.array
+        final_plot = step_plot(stepper)
         
-        colors = [] 
-        hover_labels = []
-
-        #  Assign colors based on position relative to highlighted range
-        for i in range(len(arr)):
-            if start == mid and mid == end and start == i:
-                #  single element being examined
-                colors.append("#FF8000")  # Orange (for single)
-                hover_labels.append("")
-            elif start <= i < mid:
-                # left half of split
-                colors.append("#FF6B6B")  # Red (for left half)
-                hover_labels.append("left")
-            elif mid <= i <= end:
-                # right half of split
-                colors.append("#FFD93D")  # Yellow (for right half)
-                hover_labels.append("right")
-            else:
-                # not currently involved in operation
-                colors.append("#8C8C8C")  # Grey (for non-highlighted)
-                hover_labels.append("none")
+        return (
+            stepper,                     # Keep stepper so the user can still step back
+            gr.update(                   # Show the final result
+                value=f"🏆 Sorting complete! \n✅ Final Result: {format_array_preview(final_array)}",
+                label=PROGRESS_LABEL,
+            ),
+            final_plot,                  # Show final plot
+            gr.update(visible=False),    # Hide next step button    
+            gr.update(visible=True)      # Show reset button
+        )
+
+    if stepper.position < 0:
+        # Back at the start - show the unsorted array
+        message = INTRO_MESSAGE
     else:
-        # No highlighting - use default colour
-        hover_labels = ["sorted" if finished else "unsorted"] * len(arr)
-        colors = ["#4ECDC4"] * len(arr) #Teal (for unrelated)
-
-    # Create the bar chart
-    fig = go.Figure(
-        data=[
-            go.Bar(
-                x=list(range(len(arr))),        # X-AXIS: array indices
-                y=arr,                          # Y-AXIS: array values
-                marker_color=colors,            # Bar colors
-                customdata=hover_labels,        # Custom hover text
-                hovertemplate="%{y}<br>%{customdata}<extra></extra>",
-                text=arr,                       # Show value on each bar
-                textposition="inside",          # Place text inside bars
-                textfont=dict(                  # Manage text font styling
-                    color="white",
-                    size=14,
-                    family="Arial",
-                ),
-            )
-        ]
-    )
+        with METRICS.measure("show_position/message"):
+            message = step_message(stepper)
 
-    # Configure chart layout
-    fig.update_layout(
-        showlegend=False,
-        yaxis_title="Value",
-        height=400,
-        xaxis=dict(
-            showticklabels=False,
-            showgrid=False,
-            title=f"Finished Sorted Array: {arr}" if finished else "",
+    # Create visualization for this step (drawn once per step of each cached trace)
+    plot = step_plot(stepper)
+
+    return (
+        stepper,                  # Keep stepper for next iteration
+        gr.update(                # Display step message and how far along we are
+            value=message,
+            label=f"{PROGRESS_LABEL} (step {stepper.position + 1} of {len(stepper.trace)})",
         ),
+        plot,                     # Update plot
+        gr.update(visible=True),  # Keep next step button visible
+        gr.update(visible=False)  # Keep reset button hidden
     )
 
-    return fig
 
-# --------------------------------------------------------------------------------------------------
-# UI CONTROL FUNCTIONS
-# --------------------------------------------------------------------------------------------------
+class SessionClicks:
+    """
+    This class collects the Next and Previous Step clicks of one session that
+    have not been drawn yet. Only one of the session's renders runs at a time
+    (guarded by lock, which every handler that moves the session's stepper
+    takes); clicks that arrive meanwhile just add to pending, and the next
+    render moves by all of them at once, so rapid clicking never builds up a
+    queue of renders that are out of date by the time they are sent.
+    """
+
+    def __init__(self):
+        self.lock = asyncio.Lock() # held while the session's stepper is moved and drawn
+        self.pending = 0           # steps still to move (Next adds 1, Previous takes 1 away)
+
+
+SESSION_CLICKS = {} # session hash -> SessionClicks for sessions that have clicked Next or Previous Step
+
 
-def next_step(stepper):
+def session_clicks(request):
+    """
+    Returns the session's SessionClicks, or a new unshared one when there is
+    no request (when a handler is called directly, for example by a benchmark).
+    """
+
+    if request is None:
+        return SessionClicks()
+    return SESSION_CLICKS.setdefault(request.session_hash, SessionClicks())
+
+
+def move_and_show(stepper, steps, request=None):
+    """
+    This function moves the stepper by a number of steps and builds the UI
+    update for where it lands. It runs in a worker thread, so the event loop
+    keeps answering other clicks while the plot is built.
+    
+    Args:
+        stepper (StepCursor): The session's position inside the step trace
+        steps (int): Steps to move (negative to move back)
+        request (gr.Request, optional): The click's request (used to profile the session)
+        
+    Returns:
+        tuple: Updated state values for all UI components (see show_position)
+    """
+
+    with session_profile(request), METRICS.measure("next_step"):
+        with METRICS.measure("next_step/forward"):
+            if steps == 1:
+                stepper.forward()
+            elif steps == -1:
+                stepper.back()
+            else:
+                stepper.seek(stepper.position + steps)
+        return show_position(stepper)
+
+
+async def in_worker_thread(function, *args):
+    """
+    This function runs function in a worker thread and waits for its result.
+    Cancelling the click (Pause cancels Play) cannot stop a thread that has
+    already started, so a cancelled click still waits for the thread to
+    finish before passing the cancellation on. Callers hold the session's
+    lock around this, so the lock is only let go once the stepper has
+    stopped moving.
+    
+    Args:
+        function (callable): Function to run
+        *args: Its arguments
+        
+    Returns:
+        The function's result
+    """
+
+    task = asyncio.ensure_future(asyncio.to_thread(function, *args))
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        while not task.done():
+            try:
+                await asyncio.wait({task})
+            except asyncio.CancelledError:
+                pass # cancelled again while waiting; the thread still has to finish first
+        raise
+
+
+def seek_and_show(stepper, position):
+    """
+    Moves the stepper to a position and builds the UI update for it (see
+    show_position). Runs in a worker thread, since a long jump may rebuild the
+    array from a checkpoint.
+    """
+
+    stepper.seek(position)
+    return show_position(stepper)
+
+
+async def move_by_clicks(stepper, steps, request):
+    """
+    This function adds a Next (steps=1) or Previous (steps=-1) click to the
+    session's pending clicks, then waits for its turn to draw. If an earlier
+    click of the session already drew past this one (it took every pending
+    click at once), nothing is sent.
+    
+    Args:
+        stepper (StepCursor): The session's position inside the step trace
+        steps (int): 1 for Next Step, -1 for Previous Step
+        request (gr.Request or None): The click's request
+        
+    Returns:
+        tuple or dict: Updated state values for all UI components (see
+                       show_position), or gr.skip() when there was nothing left to draw
+    """
+
+    clicks = session_clicks(request)
+    clicks.pending += steps
+
+    async with clicks.lock:
+        steps, clicks.pending = clicks.pending, 0
+        if steps == 0:
+            return gr.skip() # already drawn by an earlier click (or Next and Previous cancelled out)
+        return await in_worker_thread(move_and_show, stepper, steps, request)
+
+
+async def next_step(stepper, request: gr.Request = None):
     """
     This function is called when the user clicks "Next Step" and advances
-    the sorting algorithm by one step, updating the visualization.
+    the sorting algorithm by one step, updating the visualization. Clicks
+    that arrive while a step is being drawn are added together (see
+    move_by_clicks), so the next plot jumps ahead by all of them.
     
     Args:
-        stepper (generator or None): The merge sort step generator
+        stepper (StepCursor or None): The session's position inside the step trace
+        request (gr.Request, optional): The click's request (used to profile the session)
         
     Returns:
-        tuple: Updated state values for all UI components:
-            - generator: Updated stepper state
-            - str: progress_txtbox message
-            - Figure: Updated plot
-            - gr.update: Next step button state
-            - gr.update: Reset button state
+        tuple: Updated state values for all UI components (see show_position)
     """
 
     # Handle case where stepper is not initialized
@@ -361,67 +617,278 @@ def next_step(stepper):
             gr.update()
         )
 
-    try:
-        # Get the next step from the generator
-        step_type, message, current_array, highlight_range = next(stepper)
+    return await move_by_clicks(stepper, 1, request)
+
 
-        # Create visualization for this step
-        plot = create_bar_plot(current_array, highlight_range)
+async def previous_step(stepper, request: gr.Request = None):
+    """
+    This function is called when the user clicks "Previous Step" and moves
+    the sorting algorithm back by one step, updating the visualization.
+    Rapid clicks are added together the same way as for next_step.
+    
+    Args:
+        stepper (StepCursor or None): The session's position inside the step trace
+        request (gr.Request, optional): The click's request
         
+    Returns:
+        tuple: Updated state values for all UI components (see show_position)
+    """
+
+    # Handle case where stepper is not initialized
+    if stepper is None:
         return (
-            stepper,                  # Keep stepper for next iteration
-            message,                  # Display step message
-            plot,                     # Update plot
-            gr.update(),              # Keep next step button visible
-            gr.update()               # Keep reset button hidden
+            stepper,
+            "❌ No sorting in progress!",
+            None,
+            gr.update(),
+            gr.update()
         )
 
-    except StopIteration as e:
-        # Sorting is finished - get final array
-        final_array = e.value if e.value is not None else unsorted_array
-        final_plot = create_bar_plot(final_array, finished=True)
+    return await move_by_clicks(stepper, -1, request)
+
+
+async def skip_to_end(stepper, request: gr.Request = None):
+    """
+    This function is called when the user clicks "Skip to End" and jumps
+    straight to the sorted array.
+    
+    Args:
+        stepper (StepCursor or None): The session's position inside the step trace
+        request (gr.Request, optional): The click's request
         
+    Returns:
+        tuple: Updated state values for all UI components (see show_position)
+    """
+
+    # Handle case where stepper is not initialized
+    if stepper is None:
         return (
-            None,                        # Clear stepper
-            f"🏆 Sorting complete! \n✅ Final Result: {final_array}",
-            final_plot,                  # Show final plot
-            gr.update(visible=False),    # Hide next step button    
-            gr.update(visible=True)      # Show reset button
+            stepper,
+            "❌ No sorting in progress!",
+            None,
+            gr.update(),
+            gr.update()
+        )
+
+    async with session_clicks(request).lock:
+        return await in_worker_thread(seek_and_show, stepper, len(stepper.trace))
+
+
+async def go_to_step(stepper, step_number, request: gr.Request = None):
+    """
+    This function is called when the user clicks "Go" and jumps to the
+    chosen step (0 shows the unsorted array).
+    
+    Args:
+        stepper (StepCursor or None): The session's position inside the step trace
+        step_number (float): Step to show, counting from 1
+        request (gr.Request, optional): The click's request
+        
+    Returns:
+        tuple: Updated state values for all UI components (see show_position)
+    """
+
+    # Handle case where stepper is not initialized
+    if stepper is None:
+        return (
+            stepper,
+            "❌ No sorting in progress!",
+            None,
+            gr.update(),
+            gr.update()
+        )
+
+    # VALIDATION: the step must exist
+    if step_number is None or not 0 <= step_number <= len(stepper.trace):
+        return (
+            stepper,
+            f"❌ Please choose a step between 0 and {len(stepper.trace)}!",
+            gr.update(),
+            gr.update(),
+            gr.update()
+        )
+
+    async with session_clicks(request).lock:
+        return await in_worker_thread(seek_and_show, stepper, int(step_number) - 1)
+
+
+async def next_merge_at_depth(stepper, depth, request: gr.Request = None):
+    """
+    This function is called when the user clicks "Next Merge at Depth" and
+    jumps forward to the next merge of sub-arrays at the chosen recursion
+    depth (0 is the final merge of the whole array).
+    
+    Args:
+        stepper (StepCursor or None): The session's position inside the step trace
+        depth (float): Recursion depth to look for
+        request (gr.Request, optional): The click's request
+        
+    Returns:
+        tuple: Updated state values for all UI components (see show_position)
+    """
+
+    # Handle case where stepper is not initialized
+    if stepper is None:
+        return (
+            stepper,
+            "❌ No sorting in progress!",
+            None,
+            gr.update(),
+            gr.update()
         )
 
+    async with session_clicks(request).lock:
+        position = None
+        if depth is not None and depth >= 0:
+            position = stepper.trace.next_merge(stepper.position, int(depth))
+
+        if position is None:
+            return (
+                stepper,
+                f"❌ There are no more merges at depth {depth} after this step!",
+                gr.update(),
+                gr.update(),
+                gr.update()
+            )
+
+        return await in_worker_thread(seek_and_show, stepper, position)
+
 
-def start_sorting():
+async def play_steps(stepper, steps_per_second, request: gr.Request = None):
+    """
+    This async generator is called when the user clicks "Play" and keeps
+    advancing the sort at the chosen speed, streaming each frame to the UI
+    until the sort finishes or the user clicks "Pause". The position follows
+    the clock, so when the speed is above PLAY_MAX_FRAMES_PER_SECOND, or the
+    browser falls behind, one frame jumps over several steps instead of
+    frames piling up. Plots are built in a worker thread so the event loop
+    stays free between frames, and each frame waits for any Next or Previous
+    Step click of the session that is being drawn.
+    
+    Args:
+        stepper (StepCursor or None): The session's position inside the step trace
+        steps_per_second (float): Playback speed chosen on the slider
+        request (gr.Request, optional): The click's request
+        
+    Yields:
+        tuple: Updated state values for all UI components (see show_position)
+    """
+
+    # Handle case where stepper is not initialized
+    if stepper is None:
+        yield (
+            stepper,
+            "❌ No sorting in progress!",
+            None,
+            gr.update(),
+            gr.update()
+        )
+        return
+
+    steps_per_second = max(1.0, float(steps_per_second))
+    frame_interval = 1 / min(steps_per_second, PLAY_MAX_FRAMES_PER_SECOND)
+
+    clicks = session_clicks(request)
+    started = time.perf_counter()
+    start_position = stepper.position
+    frame = 1
+
+    while not stepper.finished:
+        # wait for this frame's turn (no wait at all if we are already late)
+        await asyncio.sleep(max(0.0, started + frame * frame_interval - time.perf_counter()))
+
+        async with clicks.lock:
+            # move to wherever the clock says we should be, but always at least one step
+            target = start_position + int((time.perf_counter() - started) * steps_per_second)
+            update = await in_worker_thread(seek_and_show, stepper, max(target, stepper.position + 1))
+
+        yield update
+        frame += 1
+
+
+def export_run(stepper, export_format):
+    """
+    This generator function is called when the user clicks "Export Animation".
+    It saves the session's sort as an animation with export_animation (every
+    step, or evenly spaced steps for very long sorts), streaming its progress
+    to the UI, and offers the file for download. "Cancel Export" stops it.
+    
+    Args:
+        stepper (StepCursor or None): The session's position inside the step trace
+        export_format (str): File extension to export (one of EXPORT_FORMATS)
+        
+    Yields:
+        tuple: (progress message, gr.update for the download file)
+    """
+
+    # Handle case where stepper is not initialized
+    if stepper is None:
+        yield "❌ No sorting in progress!", gr.update()
+        return
+
+    with download_folder() as folder:
+        output_path = os.path.join(folder, "merge_sort" + export_format)
+        exporter = export_animation(stepper.trace, output_path)
+        try:
+            while True:
+                try:
+                    written, total = next(exporter)
+                except StopIteration as e:
+                    frames = e.value
+                    break
+                yield f"🎞️ Drawn {written} of {total} frames...", gr.update(visible=False)
+        except (ImportError, ValueError, OSError) as e:
+            yield f"❌ Could not export the animation: {e}", gr.update(visible=False)
+            return
+
+        yield (
+            f"🎬 Exported all {frames} frames! Download the animation below.",
+            gr.update(value=output_path, visible=True),
+        )
+
+
+def start_sorting(unsorted_array, engine, request: gr.Request = None):
     """
     This function is called when user clicks "Start Sorting" and sets up
     the initial state for the step-by-step visualization.
     
+    Args:
+        unsorted_array (list): The array generated for this session
+        engine (str): Key of the sort engine chosen in SORT_ENGINES
+        request (gr.Request, optional): The click's request (used to profile the session)
+        
     Returns:
         tuple: Initial state values for all UI components
     """
     # NOTE: No need to validate that an array has been generated before start sorting button is presssed
     # because it is disabled until an array is generated anyway
 
-    # Create the merge sort stepper generator
-    stepper = visualize_merge_sort_steps(unsorted_array)
+    with session_profile(request), METRICS.measure("start_sorting"):
+        # Run the merge sort once and keep every step (or reuse the trace of an earlier
+        # sort of the same values), then start before the first one
+        with METRICS.measure("start_sorting/steps"):
+            stepper = StepCursor(cached_trace(unsorted_array, engine))
 
-    # Create initial visualization of unsorted array
-    initial_plot = create_bar_plot(unsorted_array)
+        # Create initial visualization of unsorted array
+        initial_plot = step_plot(stepper)
 
     return (
         stepper,                                      # Store stepper in state
         gr.update(                                    # Update progress textbox
-            value=(
-                "Here is a graphical representation of the unsorted array.\n"
-                "Click 'Next Step' to begin sorting the bars!"
-            ),
+            value=INTRO_MESSAGE,
             visible=True,
         ),
         gr.update(visible=False),                     # Hide length input textbox
         gr.update(visible=False),                     # Hide generate button
         gr.update(visible=False),                     # Hide array display textbox
         gr.update(visible=False),                     # Hide start sorting button
+        gr.update(visible=False),                     # Hide engine selector
+        gr.update(visible=False),                     # Hide data file section
+        gr.update(visible=False),                     # Hide random array options
         gr.update(value=initial_plot, visible=True),  # Show barplot area
         gr.update(visible=True),                      # Show next step button
+        gr.update(visible=True),                      # Show previous step button
+        gr.update(visible=True),                      # Show step controls
     )
 
 
@@ -434,10 +901,8 @@ def reset_app():
         tuple: Reset state values for all UI components
     """
 
-    #Clear the global array
-    unsorted_array.clear()
-
     return (
+        [],                                                    # Clear this session's array
         None,                                                  # Clear stepper state
         gr.update(value="", visible=False),                    # Hide progress textbox
         gr.update(value=None, visible=False),                  # Hide barplot area
@@ -445,113 +910,382 @@ def reset_app():
         gr.update(visible=True, interactive=True),             # Show generate button
         gr.update(value="", visible=True),                     # Show array display textbox
         gr.update(visible=True, interactive=False),            # Show disabled start button
+        gr.update(visible=True),                               # Show engine selector
+        gr.update(visible=True),                               # Show data file section
+        gr.update(visible=True),                               # Show random array options
         gr.update(visible=False),                              # Hide next step button
+        gr.update(visible=False),                              # Hide previous step button
+        gr.update(visible=False),                              # Hide step controls
         gr.update(visible=False),                              # Hide reset button
+        "",                                                    # Clear export progress
+        gr.update(value=None, visible=False),                  # Hide exported animation
+        gr.update(value=None),                                 # Clear the seed, so the next array is new
     )
 
 # --------------------------------------------------------------------------------------------------
 # GRADIO USER INTERFACE
 # --------------------------------------------------------------------------------------------------
 
-with gr.Blocks(theme=gr.themes.Citrus()) as demo:
-    # State variable to maintain stepper across function calls
-    stepper_state = gr.State(None)
+def build_demo():
+    """
+    This function builds the Gradio interface and connects every button to
+    its handler. It only runs when the UI is started (or app.demo is first
+    used), so importing this file does not build anything.
+    
+    Returns:
+        gr.Blocks: The app, with its queue set up
+    """
 
-    #Title of program
-    gr.Markdown(
-        "<h1 style='text-align:center; font-size: 36px;'>🎮 Learn Merge Sort – The Game!</h1>"
-    )
+    with gr.Blocks(
+        theme=gr.themes.Citrus(), delete_cache=(DOWNLOAD_CACHE_SECONDS, DOWNLOAD_CACHE_SECONDS)
+    ) as demo:
+        # State variables to maintain the array and stepper across function calls (one copy per session)
+        array_state = gr.State([])
+        stepper_state = gr.State(None)
 
-    # Input section
-    length_input_txtbox = gr.Textbox(
-        label="Array Length",
-        placeholder=f"Enter a number between 1 and {MAX_ARRAY_LENGTH}",
-        info="Choose how many numbers you want in your array"
-    )
+        #Title of program
+        gr.Markdown(
+            "<h1 style='text-align:center; font-size: 36px;'>🎮 Learn Merge Sort – The Game!</h1>"
+        )
 
-    # Progress/Status display
-    progress_txtbox = gr.Textbox(
-        label="What's going on now?",
-        interactive=False,
-        visible=False,
-        lines=3,
-    )
+        # Input section
+        length_input_txtbox = gr.Textbox(
+            label="Array Length",
+            placeholder=f"Enter a number between 1 and {MAX_ARRAY_LENGTH}",
+            info="Choose how many numbers you want in your array"
+        )
+        with gr.Accordion("🎛️ Random array options", open=False) as generate_options_accordion:
+            with gr.Row():
+                distribution_dropdown = gr.Dropdown(
+                    choices=[
+                        ("Uniform (any order)", "uniform"),
+                        ("Already sorted", "sorted"),
+                        ("Reversed", "reversed"),
+                        ("Nearly sorted (a few swaps)", "nearly_sorted"),
+                        ("Few unique values", "few_unique"),
+                        ("Zipf (a few values are very common)", "zipf"),
+                    ],
+                    value="uniform",
+                    label="Distribution",
+                    info="How the random numbers are spread out",
+                )
+                seed_number = gr.Number(
+                    label="Seed",
+                    value=None,
+                    precision=0,
+                    minimum=0,
+                    info="Leave blank for a new array each time; the same seed makes the same array",
+                )
+
+        # Progress/Status display
+        progress_txtbox = gr.Textbox(
+            label=PROGRESS_LABEL,
+            interactive=False,
+            visible=False,
+            lines=3,
+        )
+
+        # Generate array page
+        generate_btn = gr.Button(" Generate Random Array 🎲")
+        with gr.Accordion("...or sort your own data 📂", open=False) as data_file_accordion:
+            data_file = gr.File(
+                label="Data File",
+                file_types=list(DATA_SOURCES),
+                type="filepath",
+            )
+            with gr.Row():
+                data_column_txtbox = gr.Textbox(
+                    label="Column",
+                    placeholder="Leave blank for the first numeric column",
+                    info="Column name for CSV/Parquet, column number for 2-D .npy files",
+                )
+                data_dtype_dropdown = gr.Dropdown(
+                    choices=RAW_DTYPES,
+                    value="int64",
+                    label="Number Type",
+                    info="Only used for raw .bin/.raw files",
+                )
+            load_data_btn = gr.Button("Load Data 📥")
+            with gr.Row():
+                memory_budget_number = gr.Number(
+                    label="Memory Budget (MB)",
+                    value=EXTERNAL_SORT_MEMORY_BUDGET // 2**20,
+                    minimum=1,
+                    info="For files too big to load: how much memory the disk-based sort may use",
+                )
+                sort_on_disk_btn = gr.Button("Sort File on Disk 💾")
+            external_progress_txtbox = gr.Textbox(label="Disk Sort Progress", interactive=False)
+            sorted_file = gr.File(label="Sorted File", visible=False)
+        array_display_txtbox = gr.Textbox(label="Generated Unsorted Array")
+        engine_radio = gr.Radio(
+            choices=[
+                ("Recursive", "recursive"),
+                ("Iterative (no recursion, one buffer)", "iterative"),
+                (f"K-way ({KWAY_MERGE_WAYS} parts at a time, heap merge)", "kway"),
+                ("Parallel (several workers at once)", "parallel"),
+                ("Natural runs (Timsort-style)", "natural"),
+            ],
+            value="recursive",
+            label="Sort Engine",
+            info=(
+                "Recursive and iterative split and merge the same way; the iterative one uses less memory. "
+                f"K-way splits into {KWAY_MERGE_WAYS} parts and merges them all at once, so there are fewer levels. "
+                "Parallel sorts parts of the array in separate processes and colours each part. "
+                "Natural runs finds stretches that are already in order and merges those"
+            ),
+        )
+        start_sorting_btn = gr.Button("Start Sorting ▶️", interactive=False)
 
-    # Generate array page
-    generate_btn = gr.Button(" Generate Random Array 🎲")
-    array_display_txtbox = gr.Textbox(label="Generated Unsorted Array")
-    start_sorting_btn = gr.Button("Start Sorting ▶️", interactive=False)
+        # Visualize sorting page
+        barplot_area = gr.Plot(label="Sorting Progress", visible=False)
+        with gr.Row():
+            previous_step_btn = gr.Button("⬅️ Previous Step", visible=False)
+            next_step_btn = gr.Button("Next Step ➡️", visible=False)
+        with gr.Column(visible=False) as step_controls:
+            with gr.Row():
+                play_btn = gr.Button("Play ▶️")
+                pause_btn = gr.Button("Pause ⏸️")
+                speed_slider = gr.Slider(
+                    minimum=1,
+                    maximum=PLAY_MAX_STEPS_PER_SECOND,
+                    value=PLAY_DEFAULT_STEPS_PER_SECOND,
+                    step=1,
+                    label="Playback Speed (steps per second)",
+                )
+            with gr.Row():
+                step_number_input = gr.Number(label="Step", value=0, precision=0, minimum=0)
+                go_to_step_btn = gr.Button("Go to Step 🎯")
+                depth_input = gr.Number(label="Depth", value=0, precision=0, minimum=0)
+                next_merge_btn = gr.Button("Next Merge at Depth 🔍")
+                skip_to_end_btn = gr.Button("Skip to End ⏭️")
+            with gr.Accordion("🎬 Export animation", open=False):
+                with gr.Row():
+                    export_formats = available_export_formats() # MP4 is only offered when it can be written
+                    export_format_dropdown = gr.Dropdown(
+                        choices=[(EXPORT_FORMAT_LABELS[extension], extension) for extension in export_formats],
+                        value=".gif",
+                        label="Format",
+                        info=None if ".mp4" in export_formats else "MP4 video needs imageio and imageio-ffmpeg installed",
+                    )
+                    export_btn = gr.Button("Export Animation 🎬")
+                    cancel_export_btn = gr.Button("Cancel Export ✖️")
+                export_progress_txtbox = gr.Textbox(label="Export Progress", interactive=False)
+                export_file = gr.File(label="Animation", visible=False)
+        reset_btn = gr.Button("Try Another? 🔄", visible=False)
 
-    # Visualize sorting page
-    barplot_area = gr.Plot(label="Sorting Progress", visible=False)
-    next_step_btn = gr.Button("Next Step ➡️", visible=False)
-    reset_btn = gr.Button("Try Another? 🔄", visible=False)
+        # Performance stats (only shown when the app is started with MERGE_SORT_METRICS=1)
+        with gr.Accordion("📈 Performance stats", open=False, visible=METRICS.enabled):
+            stats_table = gr.Dataframe(
+                headers=["Phase", "Calls", "Mean (ms or bytes)", "Max (ms or bytes)", "Net allocated blocks"],
+                interactive=False,
+            )
+            with gr.Row():
+                refresh_stats_btn = gr.Button("Refresh 🔃")
+                reset_stats_btn = gr.Button("Reset")
+            metrics_txtbox = gr.Textbox(label="Prometheus metrics", lines=8, max_lines=20, interactive=False)
+            profile_checkbox = gr.Checkbox(label="Profile my clicks (cProfile, this session only)", value=False)
+            profile_txtbox = gr.Textbox(label="Profile report", lines=8, max_lines=30, interactive=False)
 
 # --------------------------------------------------------------------------------------------------
 # EVENT HANDLERS - Connect UI elements to functions
 # --------------------------------------------------------------------------------------------------
 
-    # Generate array when button clicked
-    generate_btn.click(
-        fn=generate_random_array,
-        inputs=length_input_txtbox,
-        outputs=[
-            array_display_txtbox,
-            generate_btn,
-            length_input_txtbox,
-            start_sorting_btn
-        ]
-    )
+        # Generate array when button clicked
+        generate_btn.click(
+            fn=generate_random_array,
+            inputs=[length_input_txtbox, distribution_dropdown, seed_number],
+            outputs=[
+                array_state,
+                array_display_txtbox,
+                generate_btn,
+                length_input_txtbox,
+                start_sorting_btn,
+                seed_number
+            ]
+        )
 
-    # Start sorting process when button clicked
-    start_sorting_btn.click(
-        fn=start_sorting,
-        inputs=[],
-        outputs=[
-            stepper_state,
-            progress_txtbox,
-            length_input_txtbox,
-            generate_btn,
-            array_display_txtbox,
-            start_sorting_btn,
-            barplot_area,
-            next_step_btn
-        ]
-    )
+        # Load an array from an uploaded file when button clicked
+        load_data_btn.click(
+            fn=load_data_file,
+            inputs=[data_file, data_column_txtbox, data_dtype_dropdown],
+            outputs=[
+                array_state,
+                array_display_txtbox,
+                generate_btn,
+                length_input_txtbox,
+                start_sorting_btn
+            ]
+        )
 
-    # Advance to next sorting step when button clicked
-    next_step_btn.click(
-        fn=next_step,
-        inputs=[stepper_state],
-        outputs=[
-            stepper_state,
-            progress_txtbox,
-            barplot_area,
-            next_step_btn,
-            reset_btn
-        ]
-    )
+        # Sort an uploaded file on disk (for files too large to visualize) when button clicked
+        sort_on_disk_btn.click(
+            fn=sort_file_on_disk,
+            inputs=[data_file, data_column_txtbox, data_dtype_dropdown, memory_budget_number],
+            outputs=[
+                external_progress_txtbox,
+                sorted_file
+            ]
+        )
 
-    # Reset application when button clicked
-    reset_btn.click(
-        fn=reset_app,
-        inputs=None,
-        outputs=[
-            stepper_state,
-            progress_txtbox,
-            barplot_area,
-            length_input_txtbox,
-            generate_btn,
-            array_display_txtbox,
-            start_sorting_btn,
-            next_step_btn,
-            reset_btn
-        ]
-    )
+        # Start sorting process when button clicked
+        start_sorting_btn.click(
+            fn=start_sorting,
+            inputs=[array_state, engine_radio],
+            outputs=[
+                stepper_state,
+                progress_txtbox,
+                length_input_txtbox,
+                generate_btn,
+                array_display_txtbox,
+                start_sorting_btn,
+                engine_radio,
+                data_file_accordion,
+                generate_options_accordion,
+                barplot_area,
+                next_step_btn,
+                previous_step_btn,
+                step_controls
+            ]
+        )
+
+        # Advance to next sorting step when button clicked. Both step buttons are async and
+        # only draw in worker threads, so clicks waiting for their session's turn do not need
+        # to take up a queue slot (no concurrency limit)
+        next_step_btn.click(
+            fn=next_step,
+            inputs=[stepper_state],
+            outputs=[
+                stepper_state,
+                progress_txtbox,
+                barplot_area,
+                next_step_btn,
+                reset_btn
+            ],
+            concurrency_limit=None
+        )
+
+        # Go back to the previous sorting step when button clicked
+        previous_step_btn.click(
+            fn=previous_step,
+            inputs=[stepper_state],
+            outputs=[
+                stepper_state,
+                progress_txtbox,
+                barplot_area,
+                next_step_btn,
+                reset_btn
+            ],
+            concurrency_limit=None
+        )
+
+        # Keep advancing at the chosen speed when Play is clicked, until Pause cancels it
+        play_event = play_btn.click(
+            fn=play_steps,
+            inputs=[stepper_state, speed_slider],
+            outputs=[
+                stepper_state,
+                progress_txtbox,
+                barplot_area,
+                next_step_btn,
+                reset_btn
+            ]
+        )
+        pause_btn.click(fn=None, inputs=None, outputs=None, cancels=[play_event])
+
+        # Jump around the trace when the navigation buttons are clicked
+        go_to_step_btn.click(
+            fn=go_to_step,
+            inputs=[stepper_state, step_number_input],
+            outputs=[
+                stepper_state,
+                progress_txtbox,
+                barplot_area,
+                next_step_btn,
+                reset_btn
+            ]
+        )
+        next_merge_btn.click(
+            fn=next_merge_at_depth,
+            inputs=[stepper_state, depth_input],
+            outputs=[
+                stepper_state,
+                progress_txtbox,
+                barplot_area,
+                next_step_btn,
+                reset_btn
+            ]
+        )
+        skip_to_end_btn.click(
+            fn=skip_to_end,
+            inputs=[stepper_state],
+            outputs=[
+                stepper_state,
+                progress_txtbox,
+                barplot_area,
+                next_step_btn,
+                reset_btn
+            ]
+        )
+
+        # Save the sort as an animation file, until Cancel Export stops it
+        export_event = export_btn.click(
+            fn=export_run,
+            inputs=[stepper_state, export_format_dropdown],
+            outputs=[export_progress_txtbox, export_file]
+        )
+        cancel_export_btn.click(fn=None, inputs=None, outputs=None, cancels=[export_event])
+
+        # Reset application when button clicked
+        reset_btn.click(
+            fn=reset_app,
+            inputs=None,
+            outputs=[
+                array_state,
+                stepper_state,
+                progress_txtbox,
+                barplot_area,
+                length_input_txtbox,
+                generate_btn,
+                array_display_txtbox,
+                start_sorting_btn,
+                engine_radio,
+                data_file_accordion,
+                generate_options_accordion,
+                next_step_btn,
+                previous_step_btn,
+                step_controls,
+                reset_btn,
+                export_progress_txtbox,
+                export_file,
+                seed_number
+            ]
+        )
+
+        # Performance stats panel; the refresh button also serves the metrics as the "metrics" API endpoint
+        refresh_stats_btn.click(fn=refresh_stats, inputs=None, outputs=[stats_table, metrics_txtbox], api_name="metrics")
+        reset_stats_btn.click(fn=reset_stats, inputs=None, outputs=[stats_table, metrics_txtbox])
+        profile_checkbox.change(fn=toggle_profiling, inputs=profile_checkbox, outputs=profile_txtbox)
+        demo.unload(forget_session)
+
+    # Allow several sessions to be served at once; every handler only touches its own session state
+    demo.queue(default_concurrency_limit=QUEUE_CONCURRENCY_LIMIT)
+    return demo
+
+
+def __getattr__(name):
+    """
+    Builds the interface the first time app.demo is used (for example by the
+    gradio command), and keeps it for later uses.
+    """
+
+    if name == "demo":
+        globals()["demo"] = build_demo()
+        return globals()["demo"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # --------------------------------------------------------------------------------------------------
 # MAIN EXECUTION
 # --------------------------------------------------------------------------------------------------
 
 if __name__ == "__main__":
-    demo.launch()
+    build_demo().launch()
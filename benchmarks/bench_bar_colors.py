@@ -0,0 +1,66 @@
+"""
+Micro-benchmark for bar_colors
+Compares the run-based colour/label builder in merge_sort.plots against the original
+per-bar loop at a few array sizes.
+Run with: python benchmarks/bench_bar_colors.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from merge_sort import plots
+from timing import best_time
+
+SIZES = (50, 10_000, 1_000_000)
+
+# --------------------------------------------------------------------------------------------------
+# REFERENCE IMPLEMENTATION (the original per-bar loop)
+# --------------------------------------------------------------------------------------------------
+
+def loop_bar_colors(length, highlight_range):
+    """
+    The colour/label loop bar_colors replaced, kept here as the baseline.
+    """
+
+    start, end = highlight_range
+    mid = start + (end - start + 1) // 2
+    colors = []
+    hover_labels = []
+    for i in range(length):
+        if start == mid and mid == end and start == i:
+            colors.append(plots.SINGLE_COLOR)
+            hover_labels.append("")
+        elif start <= i < mid:
+            colors.append(plots.LEFT_COLOR)
+            hover_labels.append("left")
+        elif mid <= i <= end:
+            colors.append(plots.RIGHT_COLOR)
+            hover_labels.append("right")
+        else:
+            colors.append(plots.IDLE_COLOR)
+            hover_labels.append("none")
+    return colors, hover_labels
+
+# --------------------------------------------------------------------------------------------------
+# BENCHMARK
+# --------------------------------------------------------------------------------------------------
+
+def main():
+    print(f"{'n':>10} {'loop (ms)':>12} {'runs (ms)':>12} {'speedup':>9}")
+
+    for length in SIZES:
+        highlight_range = (length // 4, length * 3 // 4) # a highlighted range in the middle of the array
+
+        # make sure both versions agree before timing them
+        expected = loop_bar_colors(length, highlight_range)
+        colors, hover_labels = plots.bar_colors(length, highlight_range)
+        assert (list(colors), list(hover_labels)) == expected
+
+        loop_ms = best_time(lambda: loop_bar_colors(length, highlight_range), repeat=5) * 1000
+        runs_ms = best_time(lambda: plots.bar_colors(length, highlight_range), repeat=5) * 1000
+        print(f"{length:>10} {loop_ms:>12.3f} {runs_ms:>12.3f} {loop_ms / runs_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark for the sort engines
+Times how long each engine in SORT_ENGINES takes to produce every step
+for random arrays of a few sizes, and how much memory it needs while doing so.
+Run with: python benchmarks/bench_engines.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from merge_sort.engines import SORT_ENGINES, get_engine
+from merge_sort.generate import generate_values
+
+SIZES = (1_000, 10_000, 100_000)
+LARGE_ARRAY_MAX_VALUE = 100 # same value range the app uses for long arrays
+
+
+def run_engine(engine, arr):
+    """
+    Consumes every step an engine yields.
+
+    Returns:
+        tuple: (number of steps, sorted array)
+    """
+
+    stepper = get_engine(engine)(arr)
+    steps = 0
+    while True:
+        try:
+            next(stepper)
+        except StopIteration as e:
+            return steps, e.value
+        steps += 1
+
+
+def main():
+    print(f"{'n':>8} {'engine':>10} {'steps':>8} {'time (s)':>10} {'peak memory (MB)':>17}")
+
+    for length in SIZES:
+        arr = generate_values(length, 0, high=LARGE_ARRAY_MAX_VALUE).tolist()
+
+        for engine in SORT_ENGINES:
+            started = time.perf_counter()
+            steps, result = run_engine(engine, arr)
+            elapsed = time.perf_counter() - started
+            assert result == sorted(arr)
+
+            # measure memory in a separate run so tracing does not slow down the timing
+            tracemalloc.start()
+            run_engine(engine, arr)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            print(f"{length:>8} {engine:>10} {steps:>8} {elapsed:>10.3f} {peak / 2**20:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Benchmark for array generation
+Times generate_values on 10 million values for every distribution, compared
+with the old way of calling random.randint once per value (on fewer values,
+since it is much slower), and checks that the same seed gives the same array.
+Run with: python benchmarks/bench_generate.py
+"""
+import os
+import random
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from merge_sort.generate import VALUE_DISTRIBUTIONS, generate_values
+from timing import best_time
+
+LENGTH = 10_000_000
+RANDINT_LENGTH = 1_000_000 # values made with random.randint (scaled up to LENGTH in the output)
+MAX_VALUE = 100            # same value range the app uses for long arrays
+
+
+def main():
+    print(f"{LENGTH} values")
+    print(f"{'distribution':>14} {'time (s)':>10}")
+
+    randint_time = best_time(lambda: [random.randint(1, MAX_VALUE) for _ in range(RANDINT_LENGTH)], repeat=1)
+    print(f"{'random.randint':>14} {randint_time * LENGTH / RANDINT_LENGTH:>10.3f}")
+
+    for distribution in VALUE_DISTRIBUTIONS:
+        values = generate_values(LENGTH, 0, distribution, high=MAX_VALUE)
+        assert np.array_equal(values, generate_values(LENGTH, 0, distribution, high=MAX_VALUE))
+        elapsed = best_time(lambda: generate_values(LENGTH, 0, distribution, high=MAX_VALUE))
+        print(f"{distribution:>14} {elapsed:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Benchmark for the parallel engine
+Times parallel_merge_sort on 10 million random values with 1, 2, 4 and 8
+worker processes and compares it with a single np.sort call. The speedup can
+only grow up to the number of CPU cores of the machine it runs on.
+Run with: python benchmarks/bench_parallel.py
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from merge_sort.generate import generate_values
+from merge_sort.parallel import parallel_merge_sort
+from timing import best_time
+
+LENGTH = 10_000_000
+WORKERS = (1, 2, 4, 8)
+
+
+def main():
+    values = generate_values(LENGTH, 0, low=0, high=2**31 - 1)
+    expected = np.sort(values, kind="stable")
+    print(f"{LENGTH} values, {os.cpu_count()} CPU cores")
+
+    numpy_time = best_time(lambda: np.sort(values, kind="stable"))
+    print(f"{'np.sort':>10} {numpy_time:>10.3f} s")
+
+    print(f"{'workers':>10} {'time (s)':>10} {'speedup':>9}")
+    single_time = None
+    for workers in WORKERS:
+        assert np.array_equal(parallel_merge_sort(values, workers), expected)
+        elapsed = best_time(lambda: parallel_merge_sort(values, workers))
+        single_time = single_time or elapsed
+        print(f"{workers:>10} {elapsed:>10.3f} {single_time / elapsed:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Benchmark suite for the sort engines and the render pipeline
+Times, for every combination of input size, value distribution and sort engine:
+  - steps:  generating every step with the engine (steps per second)
+  - render: drawing sampled steps with create_bar_plot and the per-step render_plot
+  - click:  end-to-end next_step calls after start_sorting (the work done per "Next Step" click)
+Each result reports throughput, p50/p99 latency and peak traced memory, and the
+whole run can be written as JSON so results can be compared between commits.
+
+Run with: python benchmarks/bench_suite.py [--sizes 10 1000] [--json results.json]
+          python benchmarks/bench_suite.py --help  (for every option)
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from bench_engines import run_engine
+from merge_sort.engines import SORT_ENGINES
+from merge_sort.generate import generate_values
+from merge_sort.plots import create_bar_plot, render_plot
+from merge_sort.trace import StepCursor, StepTrace
+
+SIZES = (10, 1_000, 100_000, 1_000_000)
+QUICK_SIZES = (10, 1_000, 10_000)
+BENCHMARKS = ("steps", "render", "click")
+LATENCY_SAMPLES = 50 # steps drawn per render/click benchmark
+
+# --------------------------------------------------------------------------------------------------
+# INPUT DISTRIBUTIONS
+# --------------------------------------------------------------------------------------------------
+
+# Benchmark inputs by name, as (distribution in VALUE_DISTRIBUTIONS, largest value). A largest value
+# of None means up to the length (or LARGE_ARRAY_MAX_VALUE), so long uniform arrays are mostly distinct.
+# The names of earlier versions of this suite are kept, so their JSON results can still be compared
+DISTRIBUTIONS = {
+    "random": ("uniform", None),
+    "sorted": ("sorted", None),
+    "reversed": ("reversed", None),
+    "few-unique": ("few_unique", 4), # only the values 1 to 4
+    "duplicates": ("uniform", app.SMALL_ARRAY_MAX_VALUE), # the range the app uses for small arrays, so mostly duplicates
+    "nearly-sorted": ("nearly_sorted", None),
+    "zipf": ("zipf", None),
+}
+
+
+def input_values(length, name, seed):
+    """
+    Draws the benchmark input called name (a key of DISTRIBUTIONS) with generate_values.
+    """
+
+    distribution, high = DISTRIBUTIONS[name]
+    return generate_values(length, seed, distribution, high=high or max(length, app.LARGE_ARRAY_MAX_VALUE)).tolist()
+
+# --------------------------------------------------------------------------------------------------
+# MEASUREMENT HELPERS
+# --------------------------------------------------------------------------------------------------
+
+def peak_memory(function):
+    """
+    Runs function once with tracemalloc and returns the peak traced memory in MB.
+    """
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2**20
+
+
+def latency_summary(latencies):
+    """
+    Summarizes per-call latencies (in seconds) as p50/p99/mean in milliseconds and calls per second.
+    """
+
+    latencies = np.asarray(latencies)
+    return {
+        "calls": len(latencies),
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "mean_ms": float(latencies.mean() * 1000),
+        "calls_per_second": float(len(latencies) / latencies.sum()) if latencies.sum() else None,
+    }
+
+
+def sample_positions(length, samples):
+    """
+    Returns up to samples step positions spread evenly over a trace of the given length.
+    """
+
+    return sorted(set(np.linspace(0, length - 1, min(samples, length)).astype(int).tolist()))
+
+# --------------------------------------------------------------------------------------------------
+# BENCHMARKS
+# --------------------------------------------------------------------------------------------------
+
+def bench_steps(engine, arr, measure_memory):
+    """
+    Times how long an engine takes to yield every step for arr.
+    """
+
+    started = time.perf_counter()
+    steps, result = run_engine(engine, arr)
+    elapsed = time.perf_counter() - started
+    assert list(result) == sorted(arr)
+
+    return {
+        "steps": steps,
+        "seconds": elapsed,
+        "steps_per_second": steps / elapsed if elapsed else None,
+        "values_per_second": len(arr) / elapsed if elapsed else None,
+        "peak_memory_mb": peak_memory(lambda: run_engine(engine, arr)) if measure_memory else None,
+    }
+
+
+def bench_render(engine, arr, samples, measure_memory):
+    """
+    Times create_bar_plot (the full Plotly figure, serialized to JSON as the
+    browser would receive it) and render_plot (the per-step fast path) on
+    sampled steps of a trace.
+    """
+
+    trace = StepTrace(arr, engine)
+    cursor = StepCursor(trace)
+    results = {}
+
+    for name, render in (
+        ("create_bar_plot", lambda step: create_bar_plot(cursor.array, step.highlight_range, parts=step.parts).to_json()),
+        ("render_plot", lambda step: render_plot(cursor.array, step.highlight_range, parts=step.parts).to_json()),
+    ):
+        latencies = []
+        payload_bytes = []
+        for position in sample_positions(len(trace), samples):
+            step = cursor.seek(position)
+            started = time.perf_counter()
+            payload = render(step)
+            latencies.append(time.perf_counter() - started)
+            payload_bytes.append(len(payload))
+
+        step = cursor.seek(len(trace) // 2)
+        results[name] = dict(
+            latency_summary(latencies),
+            mean_payload_bytes=float(np.mean(payload_bytes)),
+            peak_memory_mb=peak_memory(lambda: render(step)) if measure_memory else None,
+        )
+    return results
+
+
+def bench_click(engine, arr, samples, measure_memory):
+    """
+    Times start_sorting once and then next_step for up to samples clicks,
+    including the plot JSON sent for each click.
+    """
+
+    started = time.perf_counter()
+    stepper = app.start_sorting(arr, engine)[0]
+    start_seconds = time.perf_counter() - started
+
+    loop = asyncio.new_event_loop() # next_step is async, as it is when the app serves it
+    latencies = []
+    payload_bytes = []
+    for _ in range(min(samples, len(stepper.trace) + 1)):
+        started = time.perf_counter()
+        outputs = loop.run_until_complete(app.next_step(stepper))
+        payload = outputs[2].to_json()
+        latencies.append(time.perf_counter() - started)
+        payload_bytes.append(len(payload))
+
+    stepper.seek(len(stepper.trace) // 2)
+    peak_memory_mb = peak_memory(lambda: loop.run_until_complete(app.next_step(stepper))) if measure_memory else None
+    loop.close()
+    return dict(
+        latency_summary(latencies),
+        start_sorting_seconds=start_seconds,
+        mean_payload_bytes=float(np.mean(payload_bytes)),
+        peak_memory_mb=peak_memory_mb,
+    )
+
+
+def git_commit():
+    """
+    Returns the current git commit of the repository, or None outside a git checkout.
+    """
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the sort engines and the render pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", help=f"input sizes (default {SIZES})")
+    parser.add_argument("--quick", action="store_true", help=f"only run the small sizes {QUICK_SIZES}")
+    parser.add_argument("--distributions", nargs="+", choices=list(DISTRIBUTIONS), default=list(DISTRIBUTIONS))
+    parser.add_argument("--engines", nargs="+", choices=list(SORT_ENGINES), default=list(SORT_ENGINES))
+    parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--samples", type=int, default=LATENCY_SAMPLES, help="steps drawn per render/click benchmark")
+    parser.add_argument("--no-memory", action="store_true", help="skip the (slower) tracemalloc runs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON to PATH ('-' for stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+    measure_memory = not args.no_memory
+    log = sys.stderr if args.json == "-" else sys.stdout # keep stdout clean when it carries the JSON
+
+    results = []
+    print(
+        f"{'benchmark':>24} {'engine':>10} {'distribution':>13} {'n':>9} "
+        f"{'p50 (ms)':>10} {'p99 (ms)':>10} {'per second':>12} {'peak MB':>9}",
+        file=log,
+    )
+
+    for length in sizes:
+        for distribution in args.distributions:
+            arr = input_values(length, distribution, args.seed)
+
+            for engine in args.engines:
+                rows = []
+                if "steps" in args.benchmarks:
+                    rows.append(("steps", bench_steps(engine, arr, measure_memory)))
+                if "render" in args.benchmarks:
+                    for name, result in bench_render(engine, arr, args.samples, measure_memory).items():
+                        rows.append((f"render/{name}", result))
+                if "click" in args.benchmarks:
+                    rows.append(("click/next_step", bench_click(engine, arr, args.samples, measure_memory)))
+
+                for benchmark, result in rows:
+                    results.append(dict(benchmark=benchmark, engine=engine, distribution=distribution, n=length, **result))
+
+                    p50 = result.get("p50_ms", result.get("seconds", 0) * 1000)
+                    p99 = result.get("p99_ms", p50)
+                    per_second = result.get("calls_per_second", result.get("steps_per_second")) or 0
+                    peak = result["peak_memory_mb"]
+                    print(
+                        f"{benchmark:>24} {engine:>10} {distribution:>13} {length:>9} {p50:>10.3f} {p99:>10.3f} "
+                        f"{per_second:>12.0f} {'-' if peak is None else f'{peak:.2f}':>9}",
+                        file=log,
+                    )
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "seed": args.seed,
+        "results": results,
+    }
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.json}", file=log)
+
+
+if __name__ == "__main__":
+    main()
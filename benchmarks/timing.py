@@ -0,0 +1,22 @@
+"""
+Timing helper shared by the benchmarks
+Imported by the bench_*.py scripts (which run from this folder, so it is
+found without installing anything).
+"""
+import timeit
+
+
+def best_time(function, repeat=3):
+    """
+    Returns the fastest of several single runs of function, in seconds. The
+    fastest run is the one least disturbed by the rest of the machine.
+
+    Args:
+        function (callable): Code to time, called without arguments
+        repeat (int): Number of runs
+
+    Returns:
+        float: Seconds taken by the fastest run
+    """
+
+    return min(timeit.repeat(function, number=1, repeat=repeat))
@@ -0,0 +1,39 @@
+"""
+Merge Sort Visualizer - Library
+The sort engines and step traces behind the visualizer, usable without the
+Gradio interface (for example in scripts, batch jobs or from the command line
+with "python -m merge_sort"). Importing this package only loads pure Python
+code: numpy, pandas and plotly are imported by the modules that need them,
+when they are first used.
+
+Example:
+    from merge_sort import sort_array, StepTrace
+    sort_array([5, 2, 4, 1])              # [1, 2, 4, 5]
+    trace = StepTrace([5, 2, 4, 1], "iterative")
+"""
+from merge_sort.arrays import format_array_preview, working_copy
+from merge_sort.engines import (
+    SORT_ENGINES,
+    get_engine,
+    iterative_merge_sort_steps,
+    kway_merge_sort_steps,
+    sort_array,
+    visualize_merge_sort_steps,
+)
+from merge_sort.steps import SortStep, render_step_message
+from merge_sort.trace import StepCursor, StepTrace
+
+__all__ = [
+    "SORT_ENGINES",
+    "SortStep",
+    "StepCursor",
+    "StepTrace",
+    "format_array_preview",
+    "get_engine",
+    "iterative_merge_sort_steps",
+    "kway_merge_sort_steps",
+    "render_step_message",
+    "sort_array",
+    "visualize_merge_sort_steps",
+    "working_copy",
+]
@@ -0,0 +1,8 @@
+"""
+Merge Sort Visualizer - Command Line Entry Point
+Lets the command line tool run with "python -m merge_sort" (see merge_sort.cli).
+"""
+from merge_sort.cli import main
+
+if __name__ == "__main__":
+    main()
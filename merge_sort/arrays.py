@@ -0,0 +1,141 @@
+"""
+Merge Sort Visualizer - Array Helpers
+Small helpers shared by every module for copying arrays and writing them as
+text. None of them import numpy, so the pure-Python engines and the CLI start
+quickly; numpy arrays are recognised only if numpy has already been imported.
+"""
+import sys
+from array import array
+from collections import deque
+
+# --------------------------------------------------------------------------------------------------
+# TEXT FORMATTING AND ARRAY HELPERS
+# --------------------------------------------------------------------------------------------------
+
+ARRAY_PREVIEW_LENGTH = 50        # longer arrays are shortened to their first and last values in text
+
+
+def is_numpy_array(arr):
+    """
+    This function checks whether arr is a numpy array without importing numpy:
+    if numpy has not been imported yet, nothing can be a numpy array.
+    
+    Args:
+        arr: Any value
+        
+    Returns:
+        bool: True for numpy arrays (including memory-mapped ones)
+    """
+
+    numpy = sys.modules.get("numpy")
+    return numpy is not None and isinstance(arr, numpy.ndarray)
+
+
+def working_copy(arr):
+    """
+    This function makes a writable in-memory copy of an array of the same
+    kind, so numpy arrays (including memory-mapped files) stay numpy arrays
+    and are never turned into Python lists.
+    
+    Args:
+        arr (list, array or numpy.ndarray): The array to copy
+        
+    Returns:
+        list, array or numpy.ndarray: The copy
+    """
+
+    if is_numpy_array(arr):
+        return sys.modules["numpy"].array(arr) # also reads a memory-mapped array into memory
+    if isinstance(arr, array):
+        return array(arr.typecode, arr) # array.array has no copy(), and a list would lose its typecode
+    return arr.copy() if hasattr(arr, "copy") else list(arr)
+
+
+def same_kind_as(values, arr):
+    """
+    This function turns a sorted numpy array back into the kind of array the
+    caller passed in, so engines that work on numpy arrays internally still
+    return a list for a list and an array.array for an array.array. A list
+    numpy had to turn into floats (a mix of ints and floats) gets its own
+    items back, so 1 stays 1 instead of becoming 1.0.
+    
+    Args:
+        values (numpy.ndarray): The sorted values
+        arr (list, array or numpy.ndarray): The array that was sorted
+        
+    Returns:
+        list, array or numpy.ndarray: values as the same kind of array as arr
+    """
+
+    if is_numpy_array(arr):
+        return values
+    if isinstance(arr, array):
+        return array(arr.typecode, values.tolist())
+    if values.dtype.kind == "f" and any(type(item) is not float for item in arr):
+        return original_items(values.tolist(), arr)
+    return values.tolist()
+
+
+def original_items(values, arr):
+    """
+    This function puts the caller's own items in the order of the sorted
+    values. Equal items are taken in the order they had in arr, which is
+    where a stable sort puts them.
+    
+    Args:
+        values (list): The sorted values, as numpy converted them
+        arr (list): The items that were sorted
+        
+    Returns:
+        list: The items of arr in sorted order (or values itself if an item
+              cannot be matched, e.g. NaN, which is never equal to itself)
+    """
+
+    items = {} # value -> its items in arr, in order (1 and 1.0 are the same key)
+    for item in arr:
+        items.setdefault(item, deque()).append(item)
+    try:
+        return [items[value].popleft() for value in values]
+    except (KeyError, IndexError):
+        return values
+
+
+def changed_values(old, new, start):
+    """
+    This function compares a slice of the array before and after a step and
+    lists the values that changed, as the (index, old_value, new_value)
+    writes of a SortStep.
+    
+    Args:
+        old (numpy.ndarray): The values before the step
+        new (numpy.ndarray): The same positions after the step
+        start (int): Index of the first value of the slices in the full array
+        
+    Returns:
+        list: (index, old_value, new_value) tuples
+    """
+
+    offsets = (old != new).nonzero()[0]
+    return list(zip((offsets + start).tolist(), old[offsets].tolist(), new[offsets].tolist()))
+
+
+def format_array_preview(arr, limit=ARRAY_PREVIEW_LENGTH):
+    """
+    This function turns an array into text for the UI, shortening long arrays
+    to their first and last few values so messages stay readable and small.
+    
+    Args:
+        arr (list or numpy.ndarray): The array to describe
+        limit (int): Longest array that is written out in full
+        
+    Returns:
+        str: e.g. "[3, 8, 12]" or "[1, 2, ..., 99, 100] (1000 values)"
+    """
+
+    if len(arr) <= limit:
+        return "[" + ", ".join(str(value) for value in arr) + "]"
+
+    half = limit // 2
+    head = ", ".join(str(value) for value in arr[:half])
+    tail = ", ".join(str(value) for value in arr[len(arr) - half:])
+    return f"[{head}, ..., {tail}] ({len(arr)} values)"
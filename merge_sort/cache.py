@@ -0,0 +1,300 @@
+"""
+Merge Sort Visualizer - Trace Cache
+Remembers finished step traces and drawn plots by the content of the array
+they came from, so sorting the same input again (the same random array, the
+same uploaded file, or another session sorting the same values) starts
+instantly and every step it shows is already drawn and described. All of
+them are kept in least-recently-used caches bounded by bytes, and traces can
+also be kept on disk, between restarts, by setting MERGE_SORT_CACHE_DIR.
+"""
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+
+from merge_sort.arrays import is_numpy_array
+from merge_sort.plots import render_plot
+from merge_sort.steps import render_step_message
+from merge_sort.trace import StepTrace, value_store
+
+# --------------------------------------------------------------------------------------------------
+# CONTENT-KEYED CACHE OF STEP TRACES AND PLOTS
+# --------------------------------------------------------------------------------------------------
+
+TRACE_CACHE_BYTES = 256 * 2**20      # memory kept for cached traces
+FIGURE_CACHE_BYTES = 64 * 2**20      # memory kept for cached plot JSON
+MESSAGE_CACHE_BYTES = 16 * 2**20     # memory kept for cached step messages
+TRACE_CACHE_DIR = os.environ.get("MERGE_SORT_CACHE_DIR") or None # also keep traces on disk here (off by default)
+TRACE_CACHE_DISK_BYTES = 2 * 2**30   # disk space the on-disk traces may use
+TRACE_CACHE_VERSION = 1              # part of every key; bump it when the trace format changes
+HASH_BLOCK_LENGTH = 2**20            # values of a numpy array hashed at a time, so memory-mapped files are never copied whole
+
+
+def content_key(arr, engine, **options):
+    """
+    This function names a sort by what it sorts: the same values, of the same
+    type, sorted by the same engine with the same settings, always get the
+    same key.
+
+    Args:
+        arr (list or numpy.ndarray): The array to sort
+        engine (str): Key of the sort engine in SORT_ENGINES
+        **options: Engine settings (see get_engine), such as the k-way engine's ways
+
+    Returns:
+        str: A hex digest of the engine, its settings and the array's type and values
+    """
+
+    settings = "".join(f"{name}={value}:" for name, value in sorted(options.items()))
+    digest = hashlib.blake2b(f"v{TRACE_CACHE_VERSION}:{engine}:{settings}".encode(), digest_size=20)
+
+    if is_numpy_array(arr):
+        digest.update(f"numpy:{arr.dtype.str}:{arr.shape}:".encode())
+        for start in range(0, len(arr), HASH_BLOCK_LENGTH):
+            digest.update(arr[start : start + HASH_BLOCK_LENGTH].tobytes())
+        return digest.hexdigest()
+
+    # plain ints or floats are hashed as a typed array; anything else by its text
+    store = value_store(arr)
+    if isinstance(store, array):
+        store.extend(arr)
+        digest.update(f"{store.typecode}:".encode())
+        digest.update(store)
+    else:
+        digest.update(b"repr:" + repr(list(arr)).encode())
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """
+    This class keeps values up to a total size in bytes. When a new value
+    does not fit, the values used least recently are dropped until it does.
+    It is shared by every session, so all access goes through a lock.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0 # total size of the values kept
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # key -> (value, size), least recently used first
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Returns the value kept for key (marking it as just used), or None.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size):
+        """
+        Keeps a value, dropping the least recently used ones to make room.
+        Values bigger than the whole cache are not kept.
+        """
+
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, dropped) = self._entries.popitem(last=False)
+                self.nbytes -= dropped
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+            self.hits = self.misses = 0
+
+
+class DiskCache:
+    """
+    This class keeps pickled values as files in a directory, up to a total
+    size; the files used least recently (by modification time) are deleted
+    first. Only point it at a directory nobody else can write to, since the
+    files are unpickled when read.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def get(self, key):
+        """
+        Returns the value stored for key, or None if there is none (or it cannot be read).
+        """
+
+        try:
+            with open(self.path(key), "rb") as f:
+                value = pickle.load(f)
+            os.utime(self.path(key)) # mark it as just used
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Stores a value, then deletes the oldest files while over the size limit.
+        The file is written under a temporary name first, so readers never see
+        half a file.
+        """
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with tempfile.NamedTemporaryFile("wb", dir=self.directory, suffix=".tmp", delete=False) as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(f.name, self.path(key))
+            self.evict()
+        except OSError:
+            pass # the disk cache is only an extra; sorting carries on without it
+
+    def evict(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pickle"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+TRACE_CACHE = LRUCache(TRACE_CACHE_BYTES)
+FIGURE_CACHE = LRUCache(FIGURE_CACHE_BYTES)
+MESSAGE_CACHE = LRUCache(MESSAGE_CACHE_BYTES)
+DISK_TRACE_CACHE = DiskCache(TRACE_CACHE_DIR, TRACE_CACHE_DISK_BYTES) if TRACE_CACHE_DIR else None
+
+
+def cached_trace(arr, engine="recursive", **options):
+    """
+    This function returns the step trace for sorting arr with an engine,
+    reusing a cached one (from memory, then disk) when the same input has been
+    sorted before, and caching a new one otherwise.
+
+    Args:
+        arr (list or numpy.ndarray): The array to sort
+        engine (str): Key of the sort engine in SORT_ENGINES
+        **options: Engine settings (see get_engine)
+
+    Returns:
+        StepTrace: The trace, with its cache_key set
+    """
+
+    key = content_key(arr, engine, **options)
+    trace = TRACE_CACHE.get(key)
+    if trace is not None:
+        return trace
+
+    if DISK_TRACE_CACHE is not None:
+        trace = DISK_TRACE_CACHE.get(key)
+
+    if trace is None:
+        trace = StepTrace(arr, engine, **options)
+        trace.cache_key = key
+        if DISK_TRACE_CACHE is not None:
+            DISK_TRACE_CACHE.put(key, trace)
+
+    TRACE_CACHE.put(key, trace, trace.nbytes())
+    return trace
+
+
+def step_plot(stepper):
+    """
+    This function draws the plot for wherever the stepper is (with
+    render_plot), reusing the drawing from the figure cache when any session
+    has already shown this step of this trace.
+
+    Args:
+        stepper (StepCursor): A position inside a step trace
+
+    Returns:
+        FastFigure: The chart, ready to be sent to a gr.Plot
+    """
+
+    key = (stepper.trace.cache_key, stepper.position)
+    figure = FIGURE_CACHE.get(key) if key[0] is not None else None
+    if figure is not None:
+        return figure
+
+    if stepper.finished:
+        figure = render_plot(stepper.array, finished=True)
+    elif stepper.position < 0:
+        figure = render_plot(stepper.array)
+    else:
+        step = stepper.trace[stepper.position]
+        figure = render_plot(stepper.array, step.highlight_range, parts=step.parts)
+
+    if key[0] is not None:
+        FIGURE_CACHE.put(key, figure, len(figure.json))
+    return figure
+
+
+def step_message(stepper):
+    """
+    This function writes the message for the step the stepper is on. A trace
+    in the trace cache is shared and was counted at the size it had when it
+    was cached, so its messages are kept in the message cache (bounded by
+    bytes) instead of inside the trace; other traces keep their own.
+
+    Args:
+        stepper (StepCursor): A position inside a step trace
+
+    Returns:
+        str or None: The message (None before the first step or once finished)
+    """
+
+    key = (stepper.trace.cache_key, stepper.position)
+    if key[0] is None or not 0 <= stepper.position < len(stepper.trace):
+        return stepper.message
+
+    message = MESSAGE_CACHE.get(key)
+    if message is None:
+        message = render_step_message(stepper.trace[stepper.position], stepper.array)
+        MESSAGE_CACHE.put(key, message, sys.getsizeof(message))
+    return message
+
+
+def cache_stats():
+    """
+    Returns, for each cache, its hits, misses, entries and bytes kept (for the stats panel).
+    """
+
+    stats = {
+        name: dict(hits=cache.hits, misses=cache.misses, entries=len(cache), bytes=cache.nbytes)
+        for name, cache in (("trace", TRACE_CACHE), ("figure", FIGURE_CACHE), ("message", MESSAGE_CACHE))
+    }
+    if DISK_TRACE_CACHE is not None:
+        stats["disk trace"] = dict(hits=DISK_TRACE_CACHE.hits, misses=DISK_TRACE_CACHE.misses, entries=None, bytes=None)
+    return stats
@@ -0,0 +1,315 @@
+"""
+Merge Sort Visualizer - Command Line
+Sorts a data file or numbers read from standard input with any of the sort
+engines, without starting the Gradio interface, and can write every step of
+the sort as JSON Lines.
+
+Run with: python -m merge_sort numbers.txt
+          echo "5 2 4 1" | python -m merge_sort --trace steps.jsonl
+          python -m merge_sort big.npy --external -o sorted.npy
+          python -m merge_sort numbers.csv --export sort.gif
+          python -m merge_sort --help  (for every option)
+"""
+import argparse
+import json
+import math
+import sys
+
+from merge_sort.arrays import working_copy
+from merge_sort.engines import KWAY_MERGE_WAYS, SORT_ENGINES, get_engine
+from merge_sort.steps import render_step_message
+
+# --------------------------------------------------------------------------------------------------
+# READING AND WRITING VALUES
+# --------------------------------------------------------------------------------------------------
+
+def parse_numbers(text):
+    """
+    This function reads the numbers in a piece of text, separated by spaces,
+    commas or new lines. Whole numbers stay integers, anything else becomes a
+    float.
+
+    Args:
+        text (str): The text to read
+
+    Returns:
+        list: The numbers, in the order they appear
+
+    Raises:
+        ValueError: If a value is not a number, or is NaN (which cannot be sorted)
+    """
+
+    numbers = []
+    for token in text.replace(",", " ").split():
+        try:
+            numbers.append(int(token))
+        except ValueError:
+            value = float(token) # raises ValueError for anything that is not a number
+            if math.isnan(value):
+                raise ValueError("NaN values cannot be sorted") from None
+            numbers.append(value)
+    return numbers
+
+
+def read_input(source, column, dtype):
+    """
+    This function loads the values to sort, either from a data file (any
+    extension in DATA_SOURCES) or from standard input when source is "-".
+
+    Args:
+        source (str): Path of the file, or "-" for standard input
+        column (str or None): Column to use for tables and 2-D arrays
+        dtype (str): Number type of raw binary files
+
+    Returns:
+        list or numpy.ndarray: The values to sort
+    """
+
+    if source == "-":
+        return parse_numbers(sys.stdin.read())
+
+    from merge_sort.data_sources import load_array # needs numpy, so only imported for files
+
+    return load_array(source, column, dtype)
+
+
+def write_output(values, destination):
+    """
+    This function writes the sorted values to a .npy file, or as one value per
+    line to a text file or to standard output (when destination is None).
+
+    Args:
+        values (list, array or numpy.ndarray): The sorted values
+        destination (str or None): Path to write to
+    """
+
+    if destination and destination.lower().endswith(".npy"):
+        import numpy as np
+
+        np.save(destination, np.asarray(values))
+        return
+
+    if hasattr(values, "tolist"):
+        values = values.tolist() # plain Python numbers print without numpy's type names
+    lines = "".join(f"{value}\n" for value in values)
+    if destination:
+        with open(destination, "w") as f:
+            f.write(lines)
+    else:
+        sys.stdout.write(lines)
+
+# --------------------------------------------------------------------------------------------------
+# SORTING
+# --------------------------------------------------------------------------------------------------
+
+def step_record(step, message=None):
+    """
+    This function turns a step into a dictionary that can be written as JSON.
+
+    Args:
+        step (SortStep): The step
+        message (str, optional): The step's message, if it should be included
+
+    Returns:
+        dict: The step's fields (and message)
+    """
+
+    record = {
+        "kind": step.kind,
+        "range": list(step.highlight_range),
+        "depth": step.depth,
+        "writes": step.writes,
+        "comparisons": step.comparisons,
+        "comparison_count": step.comparison_count,
+        "parts": step.parts,
+    }
+    if message is not None:
+        record["message"] = message
+    return record
+
+
+def sort_values(values, engine, trace_file=None, messages=False, **options):
+    """
+    This function sorts the values with an engine, writing each step to
+    trace_file as one line of JSON if a trace is wanted.
+
+    Args:
+        values (list or numpy.ndarray): The values to sort
+        engine (str): Key of the sort engine in SORT_ENGINES
+        trace_file (file, optional): Open text file the trace is written to
+        messages (bool): Whether to add each step's message to the trace
+        **options: Engine settings (see get_engine)
+
+    Returns:
+        list, array or numpy.ndarray: The sorted values
+    """
+
+    array = working_copy(values) if messages else None # array after each step, to write the messages from
+    stepper = get_engine(engine, **options)(values)
+
+    while True:
+        try:
+            step = next(stepper)
+        except StopIteration as e:
+            return e.value
+
+        if trace_file is None:
+            continue
+        message = None
+        if messages:
+            for index, _, new in step.writes:
+                array[index] = new
+            message = render_step_message(step, array)
+        # numpy values (from files) are written as plain numbers
+        trace_file.write(json.dumps(step_record(step, message), ensure_ascii=False, default=lambda value: value.item()) + "\n")
+
+
+def sort_file_externally(source, destination, column, dtype, memory_budget):
+    """
+    This function sorts a file that may not fit in memory with sort_file_steps,
+    printing each step's progress message to standard error.
+
+    Args:
+        source (str): Path of the file to sort
+        destination (str): Path of the .npy file to write
+        column (str or None): Column to sort
+        dtype (str): Number type of raw binary files
+        memory_budget (int): Roughly how many bytes of values to hold in memory at once
+
+    Returns:
+        int: Number of values sorted
+    """
+
+    from merge_sort.external import external_step_message, sort_file_steps # needs numpy
+
+    stepper = sort_file_steps(source, destination, column, dtype, memory_budget)
+    while True:
+        try:
+            step = next(stepper)
+        except StopIteration as e:
+            return e.value
+        print(external_step_message(step, None), file=sys.stderr)
+
+
+def export_sort(values, engine, path, fps, **options):
+    """
+    This function saves sorting the values as an animation (every step, or
+    evenly spaced steps for very long sorts; see export_animation), printing
+    its progress to standard error.
+
+    Args:
+        values (list or numpy.ndarray): The values to sort
+        engine (str): Key of the sort engine in SORT_ENGINES
+        path (str): Where to write the animation (.gif, .mp4 or .html)
+        fps (int): Frames (steps) per second
+        **options: Engine settings (see get_engine)
+
+    Returns:
+        int: Number of frames written
+    """
+
+    from merge_sort.export import export_animation # needs numpy
+    from merge_sort.trace import StepTrace
+
+    exporter = export_animation(StepTrace(values, engine, **options), path, fps)
+    while True:
+        try:
+            written, total = next(exporter)
+        except StopIteration as e:
+            print(file=sys.stderr)
+            return e.value
+        print(f"\rExported {written} of {total} frames", end="", file=sys.stderr)
+
+# --------------------------------------------------------------------------------------------------
+# MAIN
+# --------------------------------------------------------------------------------------------------
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m merge_sort",
+        description="Sort numbers from a file or standard input with merge sort, optionally writing every step.",
+    )
+    parser.add_argument(
+        "input", nargs="?", default="-",
+        help="file to sort (.csv, .parquet, .npy, .bin or .raw), or '-' to read numbers from standard input (default)",
+    )
+    parser.add_argument("-o", "--output", help="write the sorted values here (.npy for a NumPy file) instead of standard output")
+    parser.add_argument("--engine", choices=list(SORT_ENGINES), default="iterative", help="sort engine (default: iterative)")
+    parser.add_argument(
+        "--ways", type=int, metavar="K",
+        help=f"parts the kway engine splits every sub-array into (default: {KWAY_MERGE_WAYS})",
+    )
+    parser.add_argument("--column", help="column to sort in a table or 2-D array (default: the first numeric one)")
+    parser.add_argument("--dtype", default="int64", help="number type of .bin/.raw files (default: int64)")
+    parser.add_argument("--trace", metavar="PATH", help="write every step as one line of JSON to PATH ('-' for standard output)")
+    parser.add_argument("--messages", action="store_true", help="include each step's explanation in the trace")
+    parser.add_argument(
+        "--export",
+        metavar="PATH",
+        help=(
+            "save the sort as an animation, showing evenly spaced steps for long sorts "
+            "(.gif, .html, or .mp4 with imageio and imageio-ffmpeg installed)"
+        ),
+    )
+    parser.add_argument("--fps", type=int, default=10, help="frames (steps) per second of the --export animation (default: 10)")
+    parser.add_argument("--external", action="store_true", help="sort a file larger than memory on disk (needs a .npy --output)")
+    parser.add_argument(
+        "--memory-budget", type=float, default=256, metavar="MB",
+        help="memory the --external sort may use, in megabytes (default: 256)",
+    )
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    # EXTERNAL SORT: the file is never loaded whole, so there are no steps to trace
+    if args.external:
+        if args.input == "-" or not (args.output or "").lower().endswith(".npy"):
+            parser.error("--external needs an input file and a .npy --output")
+        try:
+            count = sort_file_externally(
+                args.input, args.output, args.column, args.dtype, max(1, int(args.memory_budget * 2**20))
+            )
+        except (ImportError, ValueError, OSError, KeyError, IndexError) as e:
+            parser.exit(1, f"error: could not sort {args.input}: {e}\n")
+        print(f"Sorted {count} values into {args.output}", file=sys.stderr)
+        return
+
+    if args.trace == "-" and not args.output:
+        parser.error("--trace - needs --output, so the trace and the sorted values are not mixed")
+    if args.messages and not args.trace:
+        parser.error("--messages only applies together with --trace")
+    options = {} # settings passed to the engine
+    if args.ways is not None:
+        if args.engine != "kway":
+            parser.error("--ways only applies to --engine kway")
+        if args.ways < 2:
+            parser.error("--ways must be at least 2")
+        options["ways"] = args.ways
+
+    try:
+        values = read_input(args.input, args.column, args.dtype)
+    except (ImportError, ValueError, OSError, KeyError, IndexError) as e:
+        parser.exit(1, f"error: could not read {'standard input' if args.input == '-' else args.input}: {e}\n")
+
+    if args.trace is None:
+        result = sort_values(values, args.engine, **options)
+    elif args.trace == "-":
+        result = sort_values(values, args.engine, sys.stdout, args.messages, **options)
+    else:
+        with open(args.trace, "w", encoding="utf-8") as trace_file:
+            result = sort_values(values, args.engine, trace_file, args.messages, **options)
+
+    if args.export:
+        try:
+            export_sort(values, args.engine, args.export, args.fps, **options)
+        except (ImportError, ValueError, OSError) as e:
+            parser.exit(1, f"error: could not export {args.export}: {e}\n")
+
+    write_output(result, args.output)
+
+
+if __name__ == "__main__":
+    main()
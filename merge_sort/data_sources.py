@@ -0,0 +1,128 @@
+"""
+Merge Sort Visualizer - Data Sources
+Loading arrays from CSV, Parquet, .npy and raw binary files. pandas is only
+imported when a CSV or Parquet file is read.
+"""
+import os
+
+import numpy as np
+
+# --------------------------------------------------------------------------------------------------
+# DATA SOURCES (LOADING ARRAYS FROM FILES)
+# --------------------------------------------------------------------------------------------------
+
+def numeric_column(frame, column):
+    """
+    This function picks the column to sort out of a table: the named one, or
+    the first numeric column when no name is given.
+    
+    Args:
+        frame (pandas.DataFrame): The loaded table
+        column (str or None): Name of the column to use
+        
+    Returns:
+        numpy.ndarray: The column's values
+        
+    Raises:
+        ValueError: If the column is missing or not numeric
+    """
+
+    if column:
+        if column not in frame.columns:
+            raise ValueError(f"there is no column called '{column}'")
+        values = frame[column]
+    else:
+        numeric = frame.select_dtypes("number")
+        if numeric.columns.empty:
+            raise ValueError("the file has no numeric columns")
+        values = numeric.iloc[:, 0]
+
+    import pandas as pd # already imported by whoever built the frame
+
+    if not pd.api.types.is_numeric_dtype(values):
+        raise ValueError(f"column '{values.name}' is not numeric")
+    return values.dropna().to_numpy()
+
+
+def load_csv(path, column=None, dtype=None):
+    """
+    Loads one column of a CSV file (only that column is parsed when it is named).
+    """
+
+    import pandas as pd # only needed for CSV and Parquet files, so imported here
+
+    frame = pd.read_csv(path, usecols=[column] if column else None)
+    return numeric_column(frame, column)
+
+
+def load_parquet(path, column=None, dtype=None):
+    """
+    Loads one column of a Parquet file (only that column is read when it is named).
+    """
+
+    import pandas as pd
+
+    frame = pd.read_parquet(path, columns=[column] if column else None)
+    return numeric_column(frame, column)
+
+
+def load_npy(path, column=None, dtype=None):
+    """
+    Opens a .npy file as a memory-mapped array, so nothing is read until it is used.
+    2-D arrays use the given column index (default 0).
+    """
+
+    values = np.load(path, mmap_mode="r")
+    if values.ndim == 2:
+        values = values[:, int(column or 0)]
+    elif values.ndim != 1:
+        raise ValueError("only 1-D or 2-D arrays can be sorted")
+    return values
+
+
+def load_raw(path, column=None, dtype="int64"):
+    """
+    Memory-maps a headerless binary file of fixed-size numbers of the given dtype.
+    """
+
+    return np.memmap(path, dtype=np.dtype(dtype or "int64"), mode="r")
+
+
+# File readers by extension; each returns a 1-D numpy array (memory-mapped where the format allows)
+DATA_SOURCES = {
+    ".csv": load_csv,
+    ".parquet": load_parquet,
+    ".npy": load_npy,
+    ".bin": load_raw,
+    ".raw": load_raw,
+}
+RAW_DTYPES = ["int8", "int16", "int32", "int64", "uint8", "uint16", "uint32", "uint64", "float32", "float64"]
+
+
+def load_array(path, column=None, dtype="int64"):
+    """
+    This function loads a numeric array from a file in one go, using the
+    reader registered for its extension in DATA_SOURCES.
+    
+    Args:
+        path (str): Path to the file
+        column (str, optional): Column to use for tables (name) or 2-D arrays (index)
+        dtype (str): Number type of raw binary files (one of RAW_DTYPES)
+        
+    Returns:
+        numpy.ndarray: The values, possibly memory-mapped
+        
+    Raises:
+        ValueError: If the file type is unknown or the data cannot be sorted
+    """
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in DATA_SOURCES:
+        raise ValueError(f"'{extension}' files are not supported (use {', '.join(DATA_SOURCES)})")
+
+    values = DATA_SOURCES[extension](path, column, dtype)
+    if values.dtype.kind not in "iuf":
+        raise ValueError("the data is not numeric")
+    if values.dtype.kind == "f" and np.isnan(values).any():
+        raise ValueError("the data has missing (NaN) values")
+    return values
@@ -0,0 +1,367 @@
+"""
+Merge Sort Visualizer - Sort Engines
+The recursive, iterative and k-way merge sorts (pure Python), and the registry
+of every sort engine by name. Engines that need numpy live in their own modules
+and are only imported when they are used.
+"""
+import functools
+import heapq
+import importlib
+from itertools import chain
+
+from merge_sort.arrays import working_copy
+from merge_sort.steps import MESSAGE_MAX_COMPARISONS, SortStep
+
+KWAY_MERGE_WAYS = 4 # how many parts the k-way engine splits each sub-array into
+
+# --------------------------------------------------------------------------------------------------
+# MERGE SORT ALGORITHM WITH STEP-BY-STEP VISUALIZATION
+# --------------------------------------------------------------------------------------------------
+
+def visualize_merge_sort_steps(arr):
+    """
+    This generator function implements merge sort while yielding visualization 
+    data at each significant step (such as splitting, comparing, and merging).
+    Instead of the whole array, each step carries only the writes it makes, so
+    consumers can keep a history without copying the array at every step.
+    
+    Args:
+        arr (list): List of integers to sort
+        
+    Yields:
+        SortStep: One step ("split", "base" or "merge") with its highlighted
+            section and, for merges, the (index, old_value, new_value) writes it
+            makes to the full array (only positions whose value changes) and the
+            comparisons behind them
+    Returns:
+        list: The fully sorted array (returned via StopIteration)
+    """
+    
+    full_array = working_copy(arr) # create a copy of the array to track changes throughout sorting
+
+    def sort(arr, offset=0, counter=0):
+        """
+        This is the main recursive function that divides the array into halves,
+        sorts each half, and then merges them back together.
+        
+        Args:
+            arr (list): The sub-array to sort
+            offset (int): Starting index of this sub-array in the full array
+            counter (int): Current recursion depth (for messaging personalization)
+            
+        Yields:
+            tuple: Visualization data for each step
+            
+        Returns:
+            list: The sorted sub-array
+        """
+
+    # BASE CASE: Arrays with 0 or 1 element are already sorted
+        if len(arr) < 2:
+            yield SortStep("base", (offset, offset + len(arr) - 1), counter)
+            return arr
+
+    # DIVIDE STEP: Split array into two halves
+        mid = len(arr) // 2   # Find the middle index
+        left = arr[:mid]      # Left half (start to middle)
+        right = arr[mid:]     # Right half (middle to end)
+
+        yield SortStep("split", (offset, offset + len(arr) - 1), counter) #highlight the section being split
+
+    # CONQUER STEP: Recursively sort both halves by repeatedly splitting them again until base case is reached
+        left_sorted = yield from sort(left, offset, counter + 1)
+        right_sorted = yield from sort(right, offset + mid, counter + 1)
+
+    # COMBINE STEP: Merge the two sorted halves (this also writes the result into the full array)
+        result = yield from merge(left_sorted, right_sorted, offset, counter)
+            
+        return result
+
+    def merge(left, right, offset, counter):
+        """
+        This function takes two sorted sub-arrays and combines them into 
+        a single sorted array by comparing elements from each side, then
+        writes the merged result back into the full array.
+        Args:
+            left (list): First sorted sub-array
+            right (list): Second sorted sub-array
+            offset (int): Starting position in the full array
+            counter (int): Recursion depth of the sub-array being merged
+            
+        Yields:
+            SortStep: Visualization data showing the merge process
+            
+        Returns:
+            list: The merged and sorted array
+        """
+        
+        result = [] # will hold the merged, sorted array
+        left_idx = right_idx = 0   # pointers for the left and right arrays respectively
+
+        comparisons = [] # (left position, right position, took left) for the first few comparisons
+
+     # MERGE PROCESS: Compare elements from left and right arrays
+        while left_idx < len(left) and right_idx < len(right):
+            # compare current elements from both arrays
+            took_left = left[left_idx] <= right[right_idx]
+            if left_idx + right_idx < MESSAGE_MAX_COMPARISONS: # only keep the first few comparisons
+                comparisons.append((offset + left_idx, offset + len(left) + right_idx, took_left))
+
+            if took_left:
+                # if left element is smaller or equal to right, add it to result
+                result.append(left[left_idx])
+                left_idx += 1
+            else:
+                #  if right element is smaller, add it to result
+                result.append(right[right_idx])
+                right_idx += 1
+
+        comparison_count = left_idx + right_idx
+                
+    #  CLEANUP: Add any remaining elements in the left and right arrays
+        result.extend(left[left_idx:])
+        result.extend(right[right_idx:])
+
+        #  Write the merged result into the full array, keeping only positions that change
+        writes = []
+        for i, val in enumerate(result):
+            if full_array[offset + i] != val:
+                writes.append((offset + i, full_array[offset + i], val))
+                full_array[offset + i] = val
+
+        #  Yeild the merge step visualization
+        yield SortStep(
+            "merge",
+            (offset, offset + len(left) + len(right) - 1),
+            counter,
+            writes,
+            comparisons,
+            comparison_count,
+        )
+
+        return result
+
+    #  Start the sorting process from the root
+    yield from sort(full_array, 0)
+    return full_array
+
+
+def iterative_merge_sort_steps(arr):
+    """
+    This generator function sorts the array with the same splits and merges as
+    visualize_merge_sort_steps, and yields exactly the same steps, but without
+    recursion or slicing. Sub-arrays are tracked by their (start, end) indices
+    on an explicit stack, and every merge goes through one auxiliary buffer
+    allocated up front, so extra memory stays O(n) overall.
+    
+    Args:
+        arr (list): List of integers to sort
+        
+    Yields:
+        SortStep: The same steps as visualize_merge_sort_steps
+    Returns:
+        list: The fully sorted array (returned via StopIteration)
+    """
+
+    full_array = working_copy(arr) # create a copy of the array to track changes throughout sorting
+    buffer = working_copy(full_array) # auxiliary buffer each merge copies its two halves into
+
+    # Each entry is (start, end, counter, halves_sorted) for the sub-array full_array[start:end].
+    # A sub-array is pushed once to be split, and again underneath its halves so it gets merged after them.
+    stack = [(0, len(full_array), 0, False)]
+
+    while stack:
+        start, end, counter, halves_sorted = stack.pop()
+        mid = start + (end - start) // 2
+
+    # BASE CASE: Sub-arrays with 0 or 1 element are already sorted
+        if end - start < 2:
+            yield SortStep("base", (start, end - 1), counter)
+            continue
+
+    # DIVIDE STEP: Show the split, then queue the merge followed by both halves (left half on top)
+        if not halves_sorted:
+            yield SortStep("split", (start, end - 1), counter) #highlight the section being split
+            stack.append((start, end, counter, True))
+            stack.append((mid, end, counter + 1, False))
+            stack.append((start, mid, counter + 1, False))
+            continue
+
+    # COMBINE STEP: Both halves are sorted in place, so merge them from the buffer back into the array
+        buffer[start:end] = full_array[start:end]
+        left_idx, right_idx = start, mid   # read positions in the buffer
+        position = start                   # next position to fill in the full array
+        comparisons = []                   # (left position, right position, took left) for the first few comparisons
+        writes = []
+
+        def put(value):
+            """Writes value at the current position, recording it if it changes the array."""
+            if full_array[position] != value:
+                writes.append((position, full_array[position], value))
+                full_array[position] = value
+
+     # MERGE PROCESS: Compare elements from the left and right halves
+        while left_idx < mid and right_idx < end:
+            took_left = buffer[left_idx] <= buffer[right_idx]
+            if position - start < MESSAGE_MAX_COMPARISONS: # only keep the first few comparisons
+                comparisons.append((left_idx, right_idx, took_left))
+
+            if took_left:
+                put(buffer[left_idx])
+                left_idx += 1
+            else:
+                put(buffer[right_idx])
+                right_idx += 1
+            position += 1
+
+        comparison_count = position - start
+
+    #  CLEANUP: Copy any remaining elements of the left and right halves
+        for source in chain(range(left_idx, mid), range(right_idx, end)):
+            put(buffer[source])
+            position += 1
+
+        yield SortStep("merge", (start, end - 1), counter, writes, comparisons, comparison_count)
+
+    return full_array
+
+
+def kway_parts(start, end, ways):
+    """
+    This function splits the sub-array [start, end) into `ways` parts of
+    (almost) equal length, or into single values when it is shorter than that.
+    
+    Args:
+        start (int): First index of the sub-array
+        end (int): Index just past the sub-array
+        ways (int): Number of parts wanted
+        
+    Returns:
+        list: (start_index, end_index) of each part, end included
+    """
+
+    count = min(ways, end - start)
+    bounds = [start + (end - start) * number // count for number in range(count + 1)]
+    return [(bounds[number], bounds[number + 1] - 1) for number in range(count)]
+
+
+def kway_merge_sort_steps(arr, ways=KWAY_MERGE_WAYS):
+    """
+    This generator function sorts the array like iterative_merge_sort_steps,
+    but splits every sub-array into `ways` parts instead of two halves and
+    merges all of them at once with heapq.merge, which keeps the front value
+    of every part in a heap and always takes the smallest. The array is only
+    split and merged log_k(n) levels deep instead of log_2(n), so every value
+    is copied fewer times.
+    
+    Args:
+        arr (list): List of integers to sort
+        ways (int): Number of parts each sub-array is split into (k, at least 2)
+        
+    Yields:
+        SortStep: A "kway_split" step for every split and a "kway_merge" step
+            for every merge (both with the k parts as parts), and a "base"
+            step for every single value
+    Returns:
+        list: The fully sorted array (returned via StopIteration)
+        
+    Raises:
+        ValueError: If ways is smaller than 2
+    """
+
+    if ways < 2:
+        raise ValueError("a k-way merge sort needs at least 2 ways")
+
+    full_array = working_copy(arr) # create a copy of the array to track changes throughout sorting
+    buffer = working_copy(full_array) # auxiliary buffer each merge copies its parts into
+
+    # Each entry is (start, end, counter, parts_sorted) for the sub-array full_array[start:end].
+    # A sub-array is pushed once to be split, and again underneath its parts so it gets merged after them.
+    stack = [(0, len(full_array), 0, False)]
+
+    while stack:
+        start, end, counter, parts_sorted = stack.pop()
+
+    # BASE CASE: Sub-arrays with 0 or 1 element are already sorted
+        if end - start < 2:
+            yield SortStep("base", (start, end - 1), counter)
+            continue
+
+        parts = kway_parts(start, end, ways)
+
+    # DIVIDE STEP: Show the split, then queue the merge followed by every part (first part on top)
+        if not parts_sorted:
+            yield SortStep("kway_split", (start, end - 1), counter, parts=parts)
+            stack.append((start, end, counter, True))
+            stack.extend((part_start, part_end + 1, counter + 1, False) for part_start, part_end in reversed(parts))
+            continue
+
+    # COMBINE STEP: Every part is sorted in place, so merge them all from the buffer back into the array
+        buffer[start:end] = full_array[start:end]
+        writes = []
+        merged = heapq.merge(*(buffer[part_start:part_end + 1] for part_start, part_end in parts))
+        for position, value in enumerate(merged, start):
+            if full_array[position] != value:
+                writes.append((position, full_array[position], value))
+                full_array[position] = value
+
+        yield SortStep("kway_merge", (start, end - 1), counter, writes, parts=parts)
+
+    return full_array
+
+
+# Sort engines by name, as (module, function). Engines that need numpy are in their own
+# modules, which are only imported once the engine is used (see get_engine). The recursive
+# and iterative engines yield the same steps for the same input; the k-way, parallel
+# and natural-run engines split and merge in their own way
+SORT_ENGINES = {
+    "recursive": ("merge_sort.engines", "visualize_merge_sort_steps"),
+    "iterative": ("merge_sort.engines", "iterative_merge_sort_steps"),
+    "kway": ("merge_sort.engines", "kway_merge_sort_steps"),
+    "parallel": ("merge_sort.parallel", "parallel_merge_sort_steps"),
+    "natural": ("merge_sort.natural", "natural_merge_sort_steps"),
+}
+
+
+def get_engine(name, **options):
+    """
+    This function looks up a sort engine by name, importing its module the
+    first time it is used.
+    
+    Args:
+        name (str): Key of the engine in SORT_ENGINES
+        **options: Settings passed to the engine with every array (for
+            example ways=8 for the k-way engine)
+        
+    Returns:
+        function: The engine's step generator function, called as engine(arr)
+        
+    Raises:
+        KeyError: If there is no engine with that name
+    """
+
+    module, function = SORT_ENGINES[name]
+    engine = getattr(importlib.import_module(module), function)
+    return functools.partial(engine, **options) if options else engine
+
+
+def sort_array(arr, engine="iterative", **options):
+    """
+    This function sorts an array with one of the engines when only the
+    sorted result is wanted (for example in a script or batch job).
+    
+    Args:
+        arr (list, array or numpy.ndarray): Values to sort
+        engine (str): Key of the sort engine in SORT_ENGINES
+        **options: Engine settings (see get_engine)
+        
+    Returns:
+        list, array or numpy.ndarray: The sorted array
+    """
+
+    stepper = get_engine(engine, **options)(arr)
+    while True:
+        try:
+            next(stepper)
+        except StopIteration as e:
+            return e.value
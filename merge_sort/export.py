@@ -0,0 +1,491 @@
+"""
+Merge Sort Visualizer - Export
+Saving a whole sort as an animated GIF, an MP4 video or a single HTML page
+that plays every step (or, for very long sorts, evenly spaced steps, so the
+file stays a sensible size). Frames are drawn by a pool of worker processes, a chunk
+of steps at a time, and written to the file as soon as they arrive, so the
+frames of a run are never all held in memory at once.
+"""
+import importlib.util
+import json
+import os
+import struct
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from merge_sort.parallel import worker_context
+from merge_sort.plots import DEFAULT_COLOR, PALETTE_COLORS, bar_runs, plot_data, step_layout
+from merge_sort.trace import StepCursor
+
+# --------------------------------------------------------------------------------------------------
+# EXPORTING A SORT AS AN ANIMATION (GIF, MP4 OR HTML)
+# --------------------------------------------------------------------------------------------------
+
+EXPORT_FORMATS = (".gif", ".mp4", ".html")       # file types export_animation can write
+EXPORT_WIDTH = 800                               # size in pixels of GIF and MP4 frames
+EXPORT_HEIGHT = 400
+EXPORT_FRAMES_PER_SECOND = 10                    # default speed of the animation (one step per frame)
+EXPORT_MAX_FRAMES_PER_SECOND = 50                # GIF delays are in hundredths of a second, so 50 is the fastest
+EXPORT_FINAL_FRAME_SECONDS = 2                   # how long the sorted array stays on screen at the end
+EXPORT_MAX_FRAMES = 2000                         # longer sorts show evenly spaced steps instead of every step
+EXPORT_CHUNK_FRAMES = 32                         # frames a worker draws per task
+EXPORT_WORKERS = min(8, os.cpu_count() or 1)     # worker processes drawing frames
+
+EXPORT_FORMAT_LABELS = {".gif": "Animated GIF", ".mp4": "MP4 video", ".html": "Interactive HTML page"}
+
+EXPORT_BACKGROUND = "#E5ECF6" # same plot background as the charts
+# Palette of GIF and MP4 frames: the bar colours by role code (see bar_runs), then the default bar colour
+# and the background, padded to the 16 colours of a 4-bit GIF colour table
+CODE_DEFAULT = len(PALETTE_COLORS)
+CODE_BACKGROUND = CODE_DEFAULT + 1
+FRAME_PALETTE = np.zeros((16, 3), dtype=np.uint8)
+FRAME_PALETTE[: CODE_BACKGROUND + 1] = [
+    list(bytes.fromhex(color.lstrip("#"))) for color in PALETTE_COLORS + [DEFAULT_COLOR, EXPORT_BACKGROUND]
+]
+
+EXPORT_WORKER = {} # what every export worker needs (trace, positions, canvas, format, speed), set by start_export_worker
+
+
+class FrameCanvas:
+    """
+    This class draws the array into an image of palette indices: one bar per
+    value, or, when there are more values than pixel columns, one line from the
+    smallest to the largest value in each column (like create_envelope_plot).
+    The value axis is fixed by the unsorted array, since sorting only moves
+    its values around. Frames are usually drawn one step after another, so
+    only the pixel columns that differ from the last frame are redrawn.
+    """
+
+    __slots__ = ("width", "height", "bottom", "top", "bar_of_column", "gaps", "column_starts", "columns", "image")
+
+    def __init__(self, initial, width=EXPORT_WIDTH, height=EXPORT_HEIGHT):
+        """
+        Args:
+            initial (list or numpy.ndarray): The unsorted array
+            width (int): Image width in pixels
+            height (int): Image height in pixels
+        """
+
+        values = np.asarray(initial)
+        self.width = width
+        self.height = height
+        # bars grow up from zero, so the axis always includes it
+        self.bottom = min(0, values.min().item())
+        self.top = max(0, values.max().item())
+        if self.top == self.bottom:
+            self.top = self.bottom + 1
+        self.top += (self.top - self.bottom) * 0.05 # a little room above the tallest bar
+
+        length = len(values)
+        columns = np.arange(width)
+        if length <= width:
+            # each pixel column shows the bar under it; bars wider than a few pixels get a gap on both sides
+            self.bar_of_column = columns * length // width
+            self.column_starts = None
+            across = (columns * length % width) / width # how far across its bar each column is (0 to 1)
+            self.gaps = (across < 0.1) | (across >= 0.9) if width >= 4 * length else None
+        else:
+            # first index of each column, as in envelope_segments
+            self.bar_of_column = None
+            self.column_starts = np.linspace(0, length, width, endpoint=False).astype(np.int64)
+            self.gaps = None
+
+        # (top row, bottom row, palette index) of every pixel column in the last frame drawn
+        self.columns = np.full((3, width), -1, dtype=np.int64)
+        self.image = np.full((height, width), CODE_BACKGROUND, dtype=np.uint8)
+
+    def rows(self, values):
+        """
+        Returns the pixel row (0 at the top) of each value.
+        """
+
+        fraction = (self.top - np.asarray(values, dtype=np.float64)) / (self.top - self.bottom)
+        return np.rint(fraction * (self.height - 1)).astype(np.int64)
+
+    def draw(self, array, codes):
+        """
+        This function draws one frame.
+
+        Args:
+            array (list or numpy.ndarray): The array as it looks at this step
+            codes (numpy.ndarray): Palette index of every bar
+
+        Returns:
+            numpy.ndarray: (height, width) palette indices
+        """
+
+        values = np.asarray(array)
+        if self.column_starts is None:
+            first = self.rows(values[self.bar_of_column])
+            last = np.full(self.width, self.rows(0)[()])
+            colors = codes[self.bar_of_column]
+            if self.gaps is not None:
+                colors = np.where(self.gaps, CODE_BACKGROUND, colors)
+        else:
+            first = self.rows(np.maximum.reduceat(values, self.column_starts))
+            last = self.rows(np.minimum.reduceat(values, self.column_starts))
+            colors = codes[self.column_starts]
+
+        columns = np.stack((np.minimum(first, last), np.maximum(first, last), colors))
+        changed = np.flatnonzero((columns != self.columns).any(axis=0))
+        image = self.image.copy()
+        if len(changed):
+            top, bottom, colors = columns[:, changed]
+            pixel_rows = np.arange(self.height)[:, None]
+            inside = (pixel_rows >= top) & (pixel_rows <= bottom)
+            image[:, changed] = np.where(inside, colors.astype(np.uint8), np.uint8(CODE_BACKGROUND))
+        self.columns, self.image = columns, image
+        return image
+
+
+def available_export_formats():
+    """
+    Returns the file types export_animation can write with the libraries that
+    are installed here: MP4 is left out unless imageio and imageio-ffmpeg are.
+    """
+
+    if importlib.util.find_spec("imageio") and importlib.util.find_spec("imageio_ffmpeg"):
+        return EXPORT_FORMATS
+    return tuple(extension for extension in EXPORT_FORMATS if extension != ".mp4")
+
+
+def frame_codes(length, highlight_range=None, parts=None):
+    """
+    Returns the palette index of every bar for a step (see bar_runs).
+    """
+
+    runs = bar_runs(length, highlight_range, parts)
+    if runs is None:
+        return np.full(length, CODE_DEFAULT, dtype=np.uint8)
+    codes, counts = zip(*runs)
+    return np.repeat(np.array(codes, dtype=np.uint8), counts)
+
+
+def gif_frame(image, previous, duration):
+    """
+    This function encodes a frame as GIF data. Only the rectangle that differs
+    from the previous frame is stored; the rest of the previous frame is kept
+    on screen.
+
+    Args:
+        image (numpy.ndarray): The frame's palette indices
+        previous (numpy.ndarray or None): The frame before it (None for the first frame)
+        duration (int): How long to show the frame, in milliseconds
+
+    Returns:
+        bytes: The frame's graphic control extension, image descriptor and data
+    """
+
+    from PIL import GifImagePlugin, Image # Pillow comes with gradio; only needed for GIF export
+
+    height, width = image.shape
+    left, top, right, bottom = 0, 0, width, height
+    if previous is not None:
+        changed = image != previous
+        changed_rows = np.flatnonzero(changed.any(axis=1))
+        changed_columns = np.flatnonzero(changed.any(axis=0))
+        if len(changed_rows):
+            top, bottom = changed_rows[0], changed_rows[-1] + 1
+            left, right = changed_columns[0], changed_columns[-1] + 1
+        else:
+            left, top, right, bottom = 0, 0, 1, 1 # nothing changed: redraw a single pixel
+
+    region = np.ascontiguousarray(image[top:bottom, left:right])
+    frame = Image.frombytes("P", (int(right - left), int(bottom - top)), region.tobytes())
+    # disposal 1 leaves the frame on screen, so the next frame only needs its changes
+    return b"".join(GifImagePlugin.getdata(frame, offset=(int(left), int(top)), duration=duration, disposal=1))
+
+
+def frame_positions(trace, max_frames=EXPORT_MAX_FRAMES):
+    """
+    This function picks the trace positions that become frames: every
+    position from -1 (the unsorted array) to len(trace) (the sorted array)
+    when there are at most max_frames of them, otherwise max_frames evenly
+    spaced positions, always starting unsorted and ending sorted.
+
+    Args:
+        trace (StepTrace): The sort to export
+        max_frames (int): Most frames the animation may have (at least 2)
+
+    Returns:
+        numpy.ndarray: The positions, in order
+    """
+
+    if len(trace) + 2 <= max_frames:
+        return np.arange(-1, len(trace) + 1)
+    return np.unique(np.linspace(-1, len(trace), max(2, max_frames)).round().astype(np.int64))
+
+
+def start_export_worker(trace, positions, extension, fps, width, height):
+    """
+    Sets up a worker process (or the main process, when exporting without
+    workers) to draw frames of trace.
+    """
+
+    EXPORT_WORKER.update(
+        trace=trace,
+        positions=positions,
+        extension=extension,
+        fps=fps,
+        canvas=FrameCanvas(trace.initial, width, height) if extension != ".html" else None,
+    )
+
+
+def render_frames(first, last):
+    """
+    This function draws frames first to last - 1 of the trace set up by
+    start_export_worker. Frame k shows trace position positions[k] (position
+    -1 is the unsorted array and len(trace) the sorted one).
+
+    Args:
+        first (int): First frame to draw
+        last (int): Frame after the last one to draw
+
+    Returns:
+        list: One item per frame: GIF frame data (bytes) for .gif, palette
+              indices (bytes) for .mp4, or the chart's traces as JSON (str) for .html
+    """
+
+    trace, extension, canvas = EXPORT_WORKER["trace"], EXPORT_WORKER["extension"], EXPORT_WORKER["canvas"]
+    positions = EXPORT_WORKER["positions"]
+    duration = round(1000 / EXPORT_WORKER["fps"])
+    cursor = StepCursor(trace)
+    cursor.seek(positions[first - 1] if first > 0 else -1)
+
+    def draw():
+        """Draws the cursor's current position in the export's format."""
+        step = trace[cursor.position] if 0 <= cursor.position < len(trace) else None
+        highlight_range, parts = (step.highlight_range, step.parts) if step else (None, None)
+        if extension == ".html":
+            return json.dumps(plot_data(cursor.array, highlight_range, cursor.finished, parts))
+        return canvas.draw(cursor.array, frame_codes(len(cursor.array), highlight_range, parts))
+
+    # the frame before the chunk, so the first GIF frame of the chunk can also store only its changes
+    previous = draw() if extension == ".gif" and first > 0 else None
+
+    frames = []
+    for position in positions[first:last]:
+        cursor.seek(int(position))
+        frame = draw()
+        if extension == ".gif":
+            hold = EXPORT_FINAL_FRAME_SECONDS * 1000 if cursor.finished else duration
+            frames.append(gif_frame(frame, previous, hold))
+            previous = frame
+        elif extension == ".mp4":
+            frames.append(frame.tobytes())
+        else:
+            frames.append(frame)
+    return frames
+
+
+def rendered_chunks(trace, positions, extension, fps, width, height, workers):
+    """
+    This generator draws the frames for positions of the trace, a chunk at a time, and
+    yields the chunks in order. With several workers, only a few chunks are
+    queued ahead of the one being written, so memory stays bounded however
+    long the sort is.
+
+    Yields:
+        list: The frames of the next chunk (see render_frames)
+    """
+
+    chunks = [
+        (first, min(first + EXPORT_CHUNK_FRAMES, len(positions)))
+        for first in range(0, len(positions), EXPORT_CHUNK_FRAMES)
+    ]
+
+    if workers <= 1 or len(chunks) == 1:
+        start_export_worker(trace, positions, extension, fps, width, height)
+        for chunk in chunks:
+            yield render_frames(*chunk)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=worker_context(),
+        initializer=start_export_worker,
+        initargs=(trace, positions, extension, fps, width, height),
+    ) as executor:
+        pending = deque()
+        try:
+            for chunk in chunks:
+                pending.append(executor.submit(render_frames, *chunk))
+                if len(pending) > workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # when the export is stopped early, drop the queued chunks instead of drawing them
+            for future in pending:
+                future.cancel()
+
+
+def write_gif(path, chunks, width, height):
+    """
+    This generator writes an endlessly looping GIF from chunks of encoded
+    frames, yielding how many frames each chunk added.
+    """
+
+    with open(path, "wb") as f:
+        # header, screen size and the global colour table (16 colours, background colour first)
+        f.write(b"GIF89a" + struct.pack("<HHBBB", width, height, 0xB3, CODE_BACKGROUND, 0))
+        f.write(FRAME_PALETTE.tobytes())
+        f.write(b"!\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00") # loop forever
+        for frames in chunks:
+            for frame in frames:
+                f.write(frame)
+            yield len(frames)
+        f.write(b";")
+
+
+def write_mp4(path, chunks, width, height, fps):
+    """
+    This generator encodes chunks of frames into an MP4 video with imageio,
+    yielding how many frames each chunk added.
+    """
+
+    try:
+        import imageio.v2 as imageio
+    except ImportError:
+        raise ImportError("MP4 export needs imageio and imageio-ffmpeg (pip install imageio imageio-ffmpeg)") from None
+
+    writer = imageio.get_writer(path, fps=fps, macro_block_size=1)
+    try:
+        frame = None
+        for frames in chunks:
+            for indices in frames:
+                frame = FRAME_PALETTE[np.frombuffer(indices, dtype=np.uint8).reshape(height, width)]
+                writer.append_data(frame)
+            yield len(frames)
+        for _ in range(EXPORT_FINAL_FRAME_SECONDS * fps): # keep the sorted array on screen for a moment
+            writer.append_data(frame)
+    finally:
+        writer.close()
+
+
+HTML_PLAYER = """
+var plot = document.getElementById("plot");
+var slider = document.getElementById("step");
+var label = document.getElementById("label");
+var button = document.getElementById("play");
+var timer = null;
+slider.max = frames.length - 1;
+
+function show(k) {
+    slider.value = k;
+    label.textContent = k == 0 ? "unsorted" : k == frames.length - 1 ? "sorted" : "step " + (positions[k] + 1) + " of " + steps;
+    Plotly.react(plot, frames[k], k == frames.length - 1 ? finishedLayout : layout);
+}
+function pause() {
+    clearInterval(timer);
+    timer = null;
+    button.textContent = "Play \\u25B6\\uFE0F";
+}
+button.onclick = function () {
+    if (timer) { pause(); return; }
+    if (+slider.value == frames.length - 1) show(0);
+    button.textContent = "Pause \\u23F8\\uFE0F";
+    timer = setInterval(function () {
+        if (+slider.value >= frames.length - 1) { pause(); return; }
+        show(+slider.value + 1);
+    }, 1000 / fps);
+};
+slider.oninput = function () { pause(); show(+slider.value); };
+show(0);
+"""
+
+
+def write_html(path, chunks, trace, positions, fps):
+    """
+    This generator writes a single HTML page (with plotly.js included) that
+    plays the frames with a play button and a step slider, yielding how many
+    frames each chunk added. The slider's label shows which step of the trace
+    each frame is, since long sorts only keep some of the steps.
+    """
+
+    from plotly.offline import get_plotlyjs
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>Merge Sort</title>\n<script>')
+        f.write(get_plotlyjs())
+        f.write("</script>\n</head>\n<body>\n")
+        f.write('<div id="plot"></div>\n')
+        f.write('<div><button id="play"></button> <input id="step" type="range" min="0" value="0"> <span id="label"></span></div>\n')
+        f.write("<script>\n")
+        f.write(f"var fps = {fps};\n")
+        f.write(f"var steps = {len(trace)};\n")
+        f.write(f"var positions = {json.dumps(positions.tolist())};\n")
+        f.write(f"var layout = {json.dumps(step_layout(trace.initial))};\n")
+        f.write(f"var finishedLayout = {json.dumps(step_layout(trace.final, finished=True))};\n")
+        f.write("var frames = [\n")
+        for frames in chunks:
+            for frame in frames:
+                f.write(frame + ",\n")
+            yield len(frames)
+        f.write("];\n")
+        f.write(HTML_PLAYER)
+        f.write("</script>\n</body>\n</html>\n")
+
+
+def export_animation(
+    trace,
+    path,
+    fps=EXPORT_FRAMES_PER_SECOND,
+    workers=EXPORT_WORKERS,
+    width=EXPORT_WIDTH,
+    height=EXPORT_HEIGHT,
+    max_frames=EXPORT_MAX_FRAMES,
+):
+    """
+    This generator function saves a whole sort as an animation, one frame per
+    step plus the unsorted and sorted arrays. Sorts with more steps than
+    max_frames allows show evenly spaced steps instead (see frame_positions),
+    so a huge array cannot fill the disk. The file type is chosen by the
+    extension of path: .gif (drawn with Pillow), .mp4 (needs imageio and
+    imageio-ffmpeg) or .html (a Plotly chart with a play button, which works
+    offline).
+
+    Args:
+        trace (StepTrace): The sort to export
+        path (str): Where to write the animation
+        fps (int): Frames (steps) per second
+        workers (int): Worker processes drawing frames (1 draws them in this process)
+        width (int): Frame width in pixels (GIF and MP4)
+        height (int): Frame height in pixels (GIF and MP4)
+        max_frames (int): Most frames the animation may have
+
+    Yields:
+        tuple: (frames written so far, total frames) after each chunk
+    Returns:
+        int: Number of frames written (returned via StopIteration)
+
+    Raises:
+        ValueError: If the file type is not supported or the array is empty
+        ImportError: If MP4 export is asked for without imageio installed
+    """
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXPORT_FORMATS:
+        raise ValueError(f"'{extension}' files are not supported (use {', '.join(EXPORT_FORMATS)})")
+    if len(trace.initial) == 0:
+        raise ValueError("there is nothing to export for an empty array")
+
+    fps = max(1, min(int(fps), EXPORT_MAX_FRAMES_PER_SECOND))
+    positions = frame_positions(trace, max_frames) # the unsorted array, the steps shown, and the sorted array
+    total = len(positions)
+    chunks = rendered_chunks(trace, positions, extension, fps, width, height, workers)
+
+    if extension == ".gif":
+        writer = write_gif(path, chunks, width, height)
+    elif extension == ".mp4":
+        writer = write_mp4(path, chunks, width, height, fps)
+    else:
+        writer = write_html(path, chunks, trace, positions, fps)
+
+    written = 0
+    for count in writer:
+        written += count
+        yield written, total
+    return written
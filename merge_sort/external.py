@@ -0,0 +1,234 @@
+"""
+Merge Sort Visualizer - External Sort
+Sorting files larger than memory: sorted runs are written to disk and merged
+in passes.
+"""
+import heapq
+import os
+import tempfile
+
+import numpy as np
+
+from merge_sort.data_sources import load_array, numeric_column
+from merge_sort.steps import SortStep
+
+# --------------------------------------------------------------------------------------------------
+# EXTERNAL (OUT-OF-CORE) MERGE SORT FOR FILES LARGER THAN MEMORY
+# --------------------------------------------------------------------------------------------------
+
+EXTERNAL_SORT_MEMORY_BUDGET = 256 * 2**20 # default bytes of values the external sort holds in memory at once
+EXTERNAL_SORT_MAX_FAN_IN = 64             # most runs merged together in one external merge
+EXTERNAL_SORT_MIN_BLOCK = 4_096           # fewest values read from a run at a time
+
+
+def iter_array_chunks(path, chunk_length, column=None, dtype="int64"):
+    """
+    This generator reads a data file a chunk at a time, so files bigger than
+    memory can be sorted. Tables are parsed chunk by chunk and memory-mapped
+    formats are sliced, so only one chunk is ever held in memory.
+    
+    Args:
+        path (str): Path to the file (any extension in DATA_SOURCES)
+        chunk_length (int): Most values per chunk
+        column (str, optional): Column to use (see load_array)
+        dtype (str): Number type of raw binary files
+        
+    Yields:
+        numpy.ndarray: The next chunk of values
+        
+    Raises:
+        ValueError: If the file type is unknown or the data cannot be sorted
+    """
+
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == ".csv":
+        import pandas as pd
+
+        for frame in pd.read_csv(path, usecols=[column] if column else None, chunksize=chunk_length):
+            yield numeric_column(frame, column)
+    elif extension == ".parquet":
+        import pyarrow.parquet as pq # pandas' Parquet engine, only needed here to read in batches
+
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunk_length, columns=[column] if column else None)
+        for batch in batches:
+            yield numeric_column(batch.to_pandas(), column)
+    else:
+        values = load_array(path, column, dtype) # memory-mapped, so nothing is read yet
+        for start in range(0, len(values), chunk_length):
+            yield np.array(values[start : start + chunk_length])
+
+
+def merge_sorted_runs(run_paths, output, block_length):
+    """
+    This function merges sorted runs stored as .npy files into one sorted
+    output, reading each run sequentially one block at a time. A heap keeps
+    the runs ordered by the last value of their current block: every value up
+    to the smallest of those is safe to write out, so each round takes those
+    values from all blocks at once, merges them, and refills whichever block ran
+    out.
+    
+    Args:
+        run_paths (list): Paths of the sorted runs
+        output (numpy.ndarray): Where to write the merged values (usually a memory-mapped file)
+        block_length (int): How many values to read from a run at a time
+    """
+
+    readers = [np.load(path, mmap_mode="r") for path in run_paths]
+    read_positions = [0] * len(readers)
+    blocks = [None] * len(readers)
+    heap = [] # (last value of the run's current block, run number)
+
+    def refill(run):
+        """Reads the next block of a run and puts the run back on the heap if it has values left."""
+        start = read_positions[run]
+        blocks[run] = np.array(readers[run][start : start + block_length])
+        read_positions[run] += len(blocks[run])
+        if len(blocks[run]):
+            heapq.heappush(heap, (blocks[run][-1], run))
+
+    for run in range(len(readers)):
+        refill(run)
+
+    write_position = 0
+    while heap:
+        bound = heap[0][0]
+
+        # every buffered value up to the bound comes before anything still on disk
+        pieces = []
+        for run, block in enumerate(blocks):
+            if len(block):
+                cut = np.searchsorted(block, bound, side="right")
+                pieces.append(block[:cut])
+                blocks[run] = block[cut:]
+
+        merged = np.concatenate(pieces)
+        merged.sort(kind="stable")
+        output[write_position : write_position + len(merged)] = merged
+        write_position += len(merged)
+
+        # the runs whose block was used up are the ones at the top of the heap
+        while heap and not len(blocks[heap[0][1]]):
+            _, run = heapq.heappop(heap)
+            refill(run)
+
+
+def external_merge_sort_steps(chunks, output_path, memory_budget=EXTERNAL_SORT_MEMORY_BUDGET, work_dir=None):
+    """
+    This generator function sorts data that does not fit in memory. Each chunk
+    is sorted in memory and saved to disk as a run, then the runs are merged
+    in passes, at most as many at once as the memory budget allows, until one
+    sorted file is left. Progress is reported as SortSteps so the UI can show
+    it like any other sort: "run" when a run is written, "pass" when a group
+    of runs has been merged (depth is the pass number).
+    
+    Args:
+        chunks (iterable): numpy arrays holding the data in order (see iter_array_chunks)
+        output_path (str): Where to write the sorted values as a .npy file
+        memory_budget (int): Roughly how many bytes of values to hold in memory at once
+        work_dir (str, optional): Directory for temporary run files (default: system temp dir)
+        
+    Yields:
+        SortStep: A "run" or "pass" step; highlight_range covers the positions
+            (in the sorted output) of the values it handled
+    Returns:
+        int: Number of values sorted (returned via StopIteration)
+    """
+
+    with tempfile.TemporaryDirectory(dir=work_dir, prefix="merge_sort_runs_") as run_dir:
+
+    # RUN CREATION: sort each chunk in memory and write it out as a run
+        runs = [] # (path, first position, last position + 1) for the runs of the current pass
+        length = 0
+        dtype = None
+        for chunk in chunks:
+            if not len(chunk):
+                continue
+            if chunk.dtype.kind == "f" and np.isnan(chunk).any():
+                raise ValueError("the data has missing (NaN) values")
+
+            run_path = os.path.join(run_dir, f"run_0_{len(runs)}.npy")
+            np.save(run_path, np.sort(chunk, kind="stable"))
+            runs.append((run_path, length, length + len(chunk)))
+            dtype = chunk.dtype if dtype is None else np.result_type(dtype, chunk.dtype)
+            length += len(chunk)
+            yield SortStep("run", (runs[-1][1], runs[-1][2] - 1), 0)
+
+        if not runs:
+            np.save(output_path, np.empty(0))
+            return 0
+
+    # MERGE PASSES: merge groups of runs until only one is left
+        itemsize = np.dtype(dtype).itemsize
+        fan_in = max(2, min(EXTERNAL_SORT_MAX_FAN_IN, memory_budget // (itemsize * EXTERNAL_SORT_MIN_BLOCK) - 1))
+        block_length = max(EXTERNAL_SORT_MIN_BLOCK, memory_budget // (itemsize * (fan_in + 1)))
+        merge_pass = 0
+
+        while True:
+            merge_pass += 1
+            last_pass = len(runs) <= fan_in
+            next_runs = []
+
+            for group_start in range(0, len(runs), fan_in):
+                group = runs[group_start : group_start + fan_in]
+                start, end = group[0][1], group[-1][2]
+
+                if last_pass:
+                    path = output_path
+                else:
+                    path = os.path.join(run_dir, f"run_{merge_pass}_{len(next_runs)}.npy")
+                output = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(end - start,))
+                merge_sorted_runs([run_path for run_path, _, _ in group], output, block_length)
+                output.flush()
+                del output
+
+                for run_path, _, _ in group:
+                    os.remove(run_path) # free the disk space as soon as a run is merged
+                next_runs.append((path, start, end))
+                yield SortStep("pass", (start, end - 1), merge_pass)
+
+            runs = next_runs
+            if last_pass:
+                return length
+
+
+def external_step_message(step, length):
+    """
+    This function describes a step of external_merge_sort_steps.
+    
+    Args:
+        step (SortStep): A "run" or "pass" step
+        length (int or None): Total number of values, if known
+        
+    Returns:
+        str: The message shown for the step
+    """
+
+    start, end = step.highlight_range
+    of_total = f" of {length}" if length else ""
+    if step.kind == "run":
+        return f"📏 Sorted values {start + 1}–{end + 1}{of_total} in memory and saved them to disk as a run"
+    return f"🔗 Merge pass {step.depth}: merged the runs covering values {start + 1}–{end + 1}{of_total}"
+
+
+def sort_file_steps(path, output_path, column=None, dtype="int64", memory_budget=EXTERNAL_SORT_MEMORY_BUDGET):
+    """
+    This generator function sorts a data file into a .npy file with
+    external_merge_sort_steps, reading it in chunks that fit the memory budget.
+    
+    Args:
+        path (str): Path of the file to sort (any extension in DATA_SOURCES)
+        output_path (str): Where to write the sorted values as a .npy file
+        column (str, optional): Column to sort (see load_array)
+        dtype (str): Number type of raw binary files
+        memory_budget (int): Roughly how many bytes of values to hold in memory at once
+        
+    Yields:
+        SortStep: The "run" and "pass" steps of external_merge_sort_steps
+    Returns:
+        int: Number of values sorted (returned via StopIteration)
+    """
+
+    chunk_length = max(EXTERNAL_SORT_MIN_BLOCK, memory_budget // 16) # a chunk and its sorted copy fit in the budget
+    chunks = iter_array_chunks(path, chunk_length, column, dtype)
+    return (yield from external_merge_sort_steps(chunks, output_path, memory_budget))
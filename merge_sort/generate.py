@@ -0,0 +1,126 @@
+"""
+Merge Sort Visualizer - Array Generation
+Random arrays to sort, drawn in bulk with NumPy's random Generator from a
+chosen distribution. Every array comes from an explicit seed, so the same
+seed, length and distribution always give the same array (and so the same
+trace cache key).
+"""
+import secrets
+
+import numpy as np
+
+# --------------------------------------------------------------------------------------------------
+# SEEDED RANDOM ARRAYS
+# --------------------------------------------------------------------------------------------------
+
+NEARLY_SORTED_SWAP_FRACTION = 0.02 # nearly sorted arrays swap this fraction of their values (at least one pair)
+FEW_UNIQUE_VALUES = 4              # how many different values a few-unique array has
+ZIPF_EXPONENT = 1.2                # value low + k - 1 is about k ** ZIPF_EXPONENT times rarer than low
+ZIPF_MAX_RANKS = 2**20             # zipf arrays use at most this many different values
+
+
+def new_seed():
+    """
+    Returns a fresh random seed, for when the user does not pick one.
+    """
+
+    return secrets.randbelow(2**32)
+
+
+def uniform_values(rng, length, low, high):
+    """Every value from low to high is equally likely."""
+    return rng.integers(low, high, length, endpoint=True)
+
+
+def sorted_values(rng, length, low, high):
+    """
+    Uniform values in ascending order. Instead of sorting, the sorted sample
+    is built directly: the gaps between sorted uniform values follow an
+    exponential distribution, so a running sum of exponential gaps gives them
+    in order in a single pass.
+    """
+
+    gaps = rng.standard_exponential(length + 1)
+    positions = np.cumsum(gaps)
+    fractions = positions[:-1] / positions[-1] # sorted, evenly spread over (0, 1)
+    return np.minimum(low + (fractions * (high - low + 1)).astype(np.int64), high)
+
+
+def reversed_values(rng, length, low, high):
+    """Uniform values in descending order."""
+    return sorted_values(rng, length, low, high)[::-1].copy()
+
+
+def nearly_sorted_values(rng, length, low, high, swaps=None):
+    """
+    Sorted values with a few pairs swapped (by default
+    NEARLY_SORTED_SWAP_FRACTION of the values, in swaps of two).
+    """
+
+    values = sorted_values(rng, length, low, high)
+    if swaps is None:
+        swaps = max(1, int(length * NEARLY_SORTED_SWAP_FRACTION) // 2)
+    swaps = min(swaps, length // 2)
+    if swaps:
+        # distinct positions, so every swap really exchanges two values
+        positions = rng.choice(length, 2 * swaps, replace=False)
+        first, second = positions[:swaps], positions[swaps:]
+        values[first], values[second] = values[second], values[first].copy()
+    return values
+
+
+def few_unique_values(rng, length, low, high, unique=FEW_UNIQUE_VALUES):
+    """Only a handful of different values, picked at random from low to high."""
+    choices = low + rng.choice(high - low + 1, min(unique, high - low + 1), replace=False)
+    return choices[rng.integers(0, len(choices), length)]
+
+
+def zipf_values(rng, length, low, high, exponent=ZIPF_EXPONENT):
+    """
+    A few values are very common and most are rare (Zipf's law): the value
+    low + k - 1 is drawn with a chance proportional to 1 / k ** exponent.
+    """
+
+    ranks = min(high - low + 1, ZIPF_MAX_RANKS)
+    weights = np.cumsum(np.arange(1, ranks + 1, dtype=np.float64) ** -exponent)
+    return low + np.searchsorted(weights, rng.random(length) * weights[-1], side="right")
+
+
+# Distributions by name, each called as (rng, length, low, high)
+VALUE_DISTRIBUTIONS = {
+    "uniform": uniform_values,
+    "sorted": sorted_values,
+    "reversed": reversed_values,
+    "nearly_sorted": nearly_sorted_values,
+    "few_unique": few_unique_values,
+    "zipf": zipf_values,
+}
+
+
+def generate_values(length, seed, distribution="uniform", low=1, high=100):
+    """
+    This function draws an array of random integers from a distribution,
+    all at once with NumPy. The same arguments always give the same array.
+
+    Args:
+        length (int): Number of values
+        seed (int): Seed of the random generator
+        distribution (str): Key in VALUE_DISTRIBUTIONS
+        low (int): Smallest possible value
+        high (int): Largest possible value (inclusive)
+
+    Returns:
+        numpy.ndarray: The values (int64)
+
+    Raises:
+        KeyError: If there is no distribution with that name
+        ValueError: If high is smaller than low or length is negative
+    """
+
+    if high < low:
+        raise ValueError("the largest value cannot be smaller than the smallest")
+    if length < 0:
+        raise ValueError("the length cannot be negative")
+
+    rng = np.random.default_rng(seed)
+    return VALUE_DISTRIBUTIONS[distribution](rng, length, low, high).astype(np.int64, copy=False)
@@ -0,0 +1,159 @@
+"""
+Merge Sort Visualizer - Metrics
+An opt-in, in-process registry of timings, allocations and payload sizes for
+the hot path. Turn it on with the environment variable MERGE_SORT_METRICS=1.
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+
+# --------------------------------------------------------------------------------------------------
+# INSTRUMENTATION (OPT-IN TIMINGS, PAYLOAD SIZES AND PROFILING)
+# --------------------------------------------------------------------------------------------------
+
+METRICS_ENABLED = os.environ.get("MERGE_SORT_METRICS", "") not in ("", "0") # opt in with MERGE_SORT_METRICS=1
+METRICS_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30) # upper bounds (seconds) of the timing histogram
+
+
+class MetricsRegistry:
+    """
+    This class collects, for the whole process, how long each instrumented
+    phase of a click takes (as a histogram), how many memory blocks it leaves
+    allocated, and how big the data sent to the browser is. It is only filled
+    in when enabled, so it costs next to nothing otherwise.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock() # sessions record metrics from several threads at once
+        self._phases = {} # phase -> [calls, total seconds, max seconds, net allocated blocks, bucket counts]
+        self._payloads = {} # name -> [count, total bytes, max bytes]
+
+    def measure(self, phase):
+        """
+        Returns a context manager that records how long its body takes under
+        the given phase name (or does nothing when metrics are disabled).
+        """
+
+        return PhaseTimer(self, phase) if self.enabled else nullcontext()
+
+    def observe(self, phase, seconds, blocks):
+        """
+        Records one run of a phase.
+
+        Args:
+            phase (str): Name of the phase, e.g. "next_step/plot"
+            seconds (float): How long it took
+            blocks (int): Change in the number of allocated memory blocks
+        """
+
+        with self._lock:
+            record = self._phases.get(phase)
+            if record is None:
+                record = self._phases[phase] = [0, 0.0, 0.0, 0, [0] * len(METRICS_BUCKETS)]
+            record[0] += 1
+            record[1] += seconds
+            record[2] = max(record[2], seconds)
+            record[3] += blocks
+            buckets = record[4]
+            for bucket, bound in enumerate(METRICS_BUCKETS):
+                if seconds <= bound:
+                    buckets[bucket] += 1
+
+    def observe_payload(self, name, size):
+        """
+        Records the size in bytes of one payload (e.g. a plot sent to the browser).
+        """
+
+        if not self.enabled:
+            return
+        with self._lock:
+            record = self._payloads.setdefault(name, [0, 0, 0])
+            record[0] += 1
+            record[1] += size
+            record[2] = max(record[2], size)
+
+    def reset(self):
+        with self._lock:
+            self._phases.clear()
+            self._payloads.clear()
+
+    def rows(self):
+        """
+        Returns one row per phase and payload for the stats panel.
+
+        Returns:
+            list: [name, calls, mean ms (or mean bytes), max ms (or max bytes), net allocated blocks]
+        """
+
+        with self._lock:
+            rows = [
+                [phase, calls, round(total / calls * 1000, 3), round(longest * 1000, 3), blocks]
+                for phase, (calls, total, longest, blocks, _) in sorted(self._phases.items())
+            ]
+            rows += [
+                [f"{name} (bytes)", count, round(total / count), largest, None]
+                for name, (count, total, largest) in sorted(self._payloads.items())
+            ]
+        return rows
+
+    def prometheus_text(self):
+        """
+        Returns every metric in the Prometheus text exposition format.
+        """
+
+        lines = [
+            "# HELP merge_sort_phase_seconds Time spent in each instrumented phase.",
+            "# TYPE merge_sort_phase_seconds histogram",
+        ]
+        with self._lock:
+            phases = sorted(self._phases.items())
+            payloads = sorted(self._payloads.items())
+
+        for phase, (calls, total, _, _, buckets) in phases:
+            for bound, count in zip(METRICS_BUCKETS, buckets):
+                lines.append(f'merge_sort_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {count}')
+            lines.append(f'merge_sort_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} {calls}')
+            lines.append(f'merge_sort_phase_seconds_sum{{phase="{phase}"}} {total}')
+            lines.append(f'merge_sort_phase_seconds_count{{phase="{phase}"}} {calls}')
+
+        lines.append("# HELP merge_sort_phase_allocated_blocks Memory blocks left allocated by each phase, in total.")
+        lines.append("# TYPE merge_sort_phase_allocated_blocks gauge")
+        for phase, (_, _, _, blocks, _) in phases:
+            lines.append(f'merge_sort_phase_allocated_blocks{{phase="{phase}"}} {blocks}')
+
+        lines.append("# HELP merge_sort_payload_bytes Size of data sent to the browser.")
+        lines.append("# TYPE merge_sort_payload_bytes summary")
+        for name, (count, total, _) in payloads:
+            lines.append(f'merge_sort_payload_bytes_sum{{name="{name}"}} {total}')
+            lines.append(f'merge_sort_payload_bytes_count{{name="{name}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+
+class PhaseTimer:
+    """
+    Context manager returned by MetricsRegistry.measure; times its body and
+    counts the memory blocks it leaves allocated.
+    """
+
+    __slots__ = ("registry", "phase", "started", "blocks")
+
+    def __init__(self, registry, phase):
+        self.registry = registry
+        self.phase = phase
+
+    def __enter__(self):
+        self.blocks = sys.getallocatedblocks()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.started
+        self.registry.observe(self.phase, seconds, sys.getallocatedblocks() - self.blocks)
+        return False
+
+
+METRICS = MetricsRegistry(enabled=METRICS_ENABLED)
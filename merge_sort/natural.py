@@ -0,0 +1,255 @@
+"""
+Merge Sort Visualizer - Natural-Run Engine
+A Timsort-style merge sort on a typed numpy array that merges the runs
+already present in the data.
+"""
+import numpy as np
+
+from merge_sort.arrays import changed_values, same_kind_as
+from merge_sort.steps import SortStep
+
+# --------------------------------------------------------------------------------------------------
+# NATURAL MERGE SORT (TIMSORT-STYLE RUNS ON A TYPED ARRAY)
+# --------------------------------------------------------------------------------------------------
+
+NATURAL_MIN_MERGE = 32 # the natural-run engine sorts shorter arrays as one run, and extends runs to 16-32 values
+
+
+def natural_min_run(length):
+    """
+    This function picks the shortest run the natural-run engine will merge:
+    shorter runs are first extended with insertion sort. Like Timsort, it
+    keeps the top bits of length, so length / min run is a power of two or a
+    little less and the merges stay balanced.
+    
+    Args:
+        length (int): Number of values being sorted
+        
+    Returns:
+        int: Between NATURAL_MIN_MERGE / 2 and NATURAL_MIN_MERGE, or length for short arrays
+    """
+
+    extra = 0 # becomes 1 if any bit shifted off is set
+    while length >= NATURAL_MIN_MERGE:
+        extra |= length & 1
+        length >>= 1
+    return length + extra
+
+
+def gallop(run, key, side="left", from_end=False):
+    """
+    This function finds where key belongs in a sorted run, like
+    np.searchsorted, but first checks positions 1, 2, 4, 8... away from one
+    end and only binary searches the last gap. It needs about 2*log2(k)
+    comparisons when the answer is k values from that end, so it is much
+    cheaper than a full binary search when few values have to move.
+    
+    Args:
+        run (numpy.ndarray): Sorted values
+        key: Value to place
+        side (str): "left" to place key before equal values, "right" after them
+        from_end (bool): Start checking from the end of the run instead of the start
+        
+    Returns:
+        int: Number of values in run that come before key
+    """
+
+    length = len(run)
+
+    def before(position):
+        return run[position] < key if side == "left" else run[position] <= key
+
+    bound = 1
+    if not from_end:
+        # check positions 0, 1, 3, 7... until one no longer comes before key
+        while bound <= length and before(bound - 1):
+            bound *= 2
+        low, high = bound // 2, min(bound, length)
+    else:
+        # check positions length-1, length-2, length-4... until one comes before key
+        while bound <= length and not before(length - bound):
+            bound *= 2
+        low, high = max(length - bound, 0), length - bound // 2
+
+    return low + int(np.searchsorted(run[low:high], key, side))
+
+
+def galloping_merge(values, start, mid, end):
+    """
+    This function merges the sorted runs values[start:mid] and values[mid:end]
+    in place. Galloping finds the values at the start of the left run and at
+    the end of the right run that are already in place, and only the values
+    in between are merged: each one finds its place in the other run with a
+    binary search, all at once in numpy. Equal values keep their order.
+    
+    Args:
+        values (numpy.ndarray): The array being sorted
+        start (int): First index of the left run
+        mid (int): First index of the right run
+        end (int): Index just past the right run
+    """
+
+    left, right = values[start:mid], values[mid:end]
+    left_in_place = gallop(left, right[0], "right")            # left values no bigger than the first right value
+    right_kept = gallop(right, left[-1], "left", from_end=True) # right values smaller than the last left value
+    if left_in_place == len(left) or right_kept == 0:
+        return # the runs are already in order
+
+    first, second = left[left_in_place:].copy(), right[:right_kept].copy()
+    merged = np.empty(len(first) + len(second), dtype=values.dtype)
+    merged[np.arange(len(first)) + np.searchsorted(second, first, "left")] = first
+    merged[np.arange(len(second)) + np.searchsorted(first, second, "right")] = second
+    values[start + left_in_place : mid + right_kept] = merged
+
+
+def natural_merge_plan(values, min_run):
+    """
+    This function works out, before anything is moved, which runs the
+    natural-run engine will find and in which order it will merge them. Run
+    boundaries only depend on values that have not been touched yet, and the
+    merge order only depends on run lengths, so the whole plan can be made
+    from the unsorted array. Knowing every merge in advance gives each merge
+    a depth counted from the final merge, like the other engines' depths.
+    
+    Args:
+        values (numpy.ndarray): The unsorted values
+        min_run (int): Shortest run (see natural_min_run)
+        
+    Returns:
+        tuple: (events, depths) where events lists ("run", start, run_end, end,
+               descending) and ("merge", top) in order, and depths[k] is how
+               many merges still to come contain the range of the k-th merge
+    """
+
+    length = len(values)
+
+    # Every place where the next value is smaller (ends an ascending run) or not smaller (ends a
+    # descending run); found once for the whole array, then searched to find where each run ends
+    descents = np.flatnonzero(values[1:] < values[:-1])
+    rises = np.flatnonzero(values[1:] >= values[:-1])
+
+    events = []
+    runs = []    # (start, end, number of the merge that made it or None) of the runs waiting to be merged
+    parents = [] # for every merge, the number of the later merge that takes in its result
+    start = 0
+
+    while runs or start < length:
+
+    # FINDING A RUN: take the longest ascending (or strictly descending) stretch from start
+        if start < length:
+            descending = bool(start + 1 < length and values[start + 1] < values[start])
+            ends = rises if descending else descents
+            found = np.searchsorted(ends, start)
+            run_end = int(ends[found]) + 1 if found < len(ends) else length
+            end = min(max(run_end, start + min_run), length)
+            runs.append((start, end, None))
+            events.append(("run", start, run_end, end, descending))
+            start = end
+
+    # MERGING: keep run lengths shrinking down the stack (each longer than the two above it
+    # together), which keeps merges balanced; once the array is used up, merge everything
+        while len(runs) > 1:
+            top = len(runs) - 2 # merge runs[top] and runs[top + 1]
+            lengths = [run_end - run_start for run_start, run_end, _ in runs]
+            if start < length:
+                if (top > 0 and lengths[top - 1] <= lengths[top] + lengths[top + 1]) or (
+                    top > 1 and lengths[top - 2] <= lengths[top - 1] + lengths[top]
+                ):
+                    if lengths[top - 1] < lengths[top + 1]:
+                        top -= 1
+                elif lengths[top] > lengths[top + 1]:
+                    break # the stack is balanced; go and find the next run
+            elif top > 0 and lengths[top - 1] < lengths[top + 1]:
+                top -= 1
+
+            number = len(parents)
+            parents.append(None)
+            for _, _, child in runs[top : top + 2]:
+                if child is not None:
+                    parents[child] = number
+            runs[top : top + 2] = [(runs[top][0], runs[top + 1][1], number)]
+            events.append(("merge", top))
+
+        if start >= length:
+            break
+
+    # the last merge is the whole array (depth 0); every other merge is one deeper than the merge that takes it in
+    depths = [0] * len(parents)
+    for number in reversed(range(len(parents))):
+        if parents[number] is not None:
+            depths[number] = depths[parents[number]] + 1
+    return events, depths
+
+
+def natural_merge_sort_steps(arr):
+    """
+    This generator function sorts the array the way Timsort does. It walks
+    through the array once looking for runs that are already in order
+    (descending runs are flipped), extends runs shorter than
+    natural_min_run with binary insertion sort, and keeps a stack of runs
+    that are merged with galloping_merge whenever their lengths get out of
+    balance (the order is planned up front by natural_merge_plan). Already
+    sorted input is a single run, so it takes O(n) time instead of
+    O(n log n). The values are copied into a typed numpy array first, so
+    list, array.array and numpy input are all handled the same way.
+    
+    Args:
+        arr (list, array or numpy.ndarray): Numbers to sort
+        
+    Yields:
+        SortStep: A "natural_run" step for every run found (parts lists the
+            runs on the stack), and a "merge" step for every merge (parts
+            holds the two runs; depth counts the merges still to come that
+            contain them, so 0 is the final merge of the whole array)
+    Returns:
+        list, array or numpy.ndarray: The sorted array, of the same kind as arr (returned via StopIteration)
+    """
+
+    values = np.array(arr)
+    if values.dtype.kind not in "biuf":
+        raise TypeError("the natural-run engine can only sort numbers")
+    events, depths = natural_merge_plan(values, natural_min_run(len(values)))
+
+    runs = [] # (start, end) of the runs waiting to be merged, end exclusive
+    merges = 0
+
+    for event in events:
+        if event[0] == "run":
+            _, start, run_end, end, descending = event
+            before = values[start:end].copy()
+
+            if descending:
+                values[start:run_end] = values[start:run_end][::-1] # strictly descending, so flipping keeps equal values in order
+
+            # extend short runs to min_run values with binary insertion sort
+            for position in range(run_end, end):
+                value = values[position]
+                target = start + int(np.searchsorted(values[start:position], value, "right"))
+                values[target + 1 : position + 1] = values[target:position]
+                values[target] = value
+
+            runs.append((start, end))
+            yield SortStep(
+                "natural_run",
+                (start, end - 1),
+                0,
+                changed_values(before, values[start:end], start),
+                parts=[(run_start, run_end - 1) for run_start, run_end in runs],
+            )
+            continue
+
+        top = event[1] # merge runs[top] and runs[top + 1]
+        (left_start, mid), (_, right_end) = runs[top], runs[top + 1]
+        before = values[left_start:right_end].copy()
+        galloping_merge(values, left_start, mid, right_end)
+        runs[top : top + 2] = [(left_start, right_end)]
+        yield SortStep(
+            "merge",
+            (left_start, right_end - 1),
+            depths[merges],
+            changed_values(before, values[left_start:right_end], left_start),
+            parts=[(left_start, mid - 1), (mid, right_end - 1)],
+        )
+        merges += 1
+
+    return same_kind_as(values, arr)
@@ -0,0 +1,290 @@
+"""
+Merge Sort Visualizer - Parallel Engine
+A merge sort that splits the array between several worker processes, which
+read and write the values in shared memory.
+"""
+import atexit
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from merge_sort.arrays import changed_values, same_kind_as, working_copy
+from merge_sort.steps import SortStep
+
+# --------------------------------------------------------------------------------------------------
+# PARALLEL MERGE SORT (SEVERAL WORKER PROCESSES SHARING ONE ARRAY)
+# --------------------------------------------------------------------------------------------------
+
+PARALLEL_SORT_WORKERS = min(8, os.cpu_count() or 1) # worker processes used by the parallel engine
+PARALLEL_SORT_MIN_PARTS = 4                         # the parallel engine splits the array into at least this many parts
+
+
+def worker_context():
+    """
+    Returns how worker processes are started. They are never forked straight
+    from this process: the app runs Gradio's threads, and forking a process
+    with threads can copy a lock that another thread holds, leaving the
+    worker stuck forever. A fork server (or a fresh interpreter where there
+    is none, as on Windows) starts them from a clean single-threaded process.
+    """
+
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+@lru_cache(maxsize=None)
+def parallel_executor(workers):
+    """
+    Returns the process pool used by every parallel sort with this many
+    workers, starting it the first time it is needed.
+    """
+
+    return ProcessPoolExecutor(max_workers=workers, mp_context=worker_context())
+
+
+# let go of the pools while the interpreter can still shut them down cleanly
+atexit.register(parallel_executor.cache_clear)
+
+
+def attach_shared_array(name, length, dtype):
+    """
+    This function opens a shared memory block created by another process and
+    views it as a numpy array, so workers read and write the values in place
+    instead of having them pickled and copied to them.
+    
+    Args:
+        name (str): Name of the shared memory block
+        length (int): Number of values in the block
+        dtype (str): numpy type of the values
+        
+    Returns:
+        tuple: (SharedMemory, numpy.ndarray); the array must be deleted before
+               the SharedMemory is closed
+    """
+
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray((length,), dtype=dtype, buffer=block.buf)
+
+
+def sort_shared_part(source, target, length, dtype, start, end):
+    """
+    Worker task of the parallel engine: sorts values [start, end) of the
+    shared array source and writes them to the same positions of target.
+    Parts are the leaves of this merge sort, so they are sorted with numpy's
+    own stable sort (a radix sort for small integer types, Timsort otherwise)
+    rather than split any further; only the merges above them are done here.
+    """
+
+    source_block, source_values = attach_shared_array(source, length, dtype)
+    target_block, target_values = attach_shared_array(target, length, dtype)
+    try:
+        target_values[start:end] = np.sort(source_values[start:end], kind="stable")
+    finally:
+        del source_values, target_values
+        source_block.close()
+        target_block.close()
+
+
+def merge_path_split(left, right, count):
+    """
+    This function finds how many of the first count values of the merge of
+    two sorted runs come from the left run (equal values are taken from the
+    left first, like every merge in this file), using a binary search along
+    the "merge path". It lets several workers each produce a different slice
+    of one merge without talking to each other.
+    
+    Args:
+        left (numpy.ndarray): Sorted left run
+        right (numpy.ndarray): Sorted right run
+        count (int): Number of merged values (0 to len(left) + len(right))
+        
+    Returns:
+        int: How many of those values come from the left run
+    """
+
+    low, high = max(0, count - len(right)), min(count, len(left))
+    while low < high:
+        taken = (low + high) // 2
+        if left[taken] <= right[count - taken - 1]:
+            low = taken + 1 # left[taken] comes before right[count - taken - 1], so more are taken from the left
+        else:
+            high = taken
+    return low
+
+
+def merge_shared_runs(source, target, length, dtype, start, mid, end, first, last):
+    """
+    Worker task of the parallel engine: merges the sorted runs [start, mid)
+    and [mid, end) of the shared array source, but only writes merged values
+    first to last - 1 (counted from start) into the same positions of target.
+    """
+
+    source_block, source_values = attach_shared_array(source, length, dtype)
+    target_block, target_values = attach_shared_array(target, length, dtype)
+    left = right = None
+    try:
+        left, right = source_values[start:mid], source_values[mid:end]
+        left_first = merge_path_split(left, right, first)
+        left_last = merge_path_split(left, right, last)
+
+        # both pieces are already sorted, so a stable sort of the two put together merges them: numpy's
+        # stable sort (Timsort, or radix sort for 8- and 16-bit integers) does it in one linear pass in C,
+        # about 3x faster than placing every value with np.searchsorted as galloping_merge does
+        merged = np.concatenate((left[left_first:left_last], right[first - left_first : last - left_last]))
+        merged.sort(kind="stable")
+        target_values[start + first : start + last] = merged
+    finally:
+        del source_values, target_values, left, right
+        source_block.close()
+        target_block.close()
+
+
+def parallel_merge_sort_steps(arr, workers=None, record_writes=True):
+    """
+    This generator function sorts the array with several worker processes.
+    The array is split into parts that workers sort at the same time, then
+    neighbouring runs are merged in rounds until one is left; each merge is
+    itself split between workers (see merge_path_split), so the last merges
+    run in parallel too. The values live in two shared memory blocks that
+    every worker reads from and writes to directly, swapping roles each round.
+    
+    Progress is reported as each worker finishes: a "run" step when a part
+    has been sorted, and a "pass" step when two runs have been merged (depth
+    is the merge round). Every step lists the parts being worked on at the
+    same time so the plot can colour them differently.
+    
+    Workers are not forked (see worker_context), so they import the script
+    that was started; scripts that sort in parallel must start their work
+    under if __name__ == "__main__".
+    
+    Args:
+        arr (list or numpy.ndarray): Numbers to sort
+        workers (int, optional): Number of worker processes (default PARALLEL_SORT_WORKERS)
+        record_writes (bool): Whether steps list the values they change (not
+            needed when only the sorted result is wanted)
+        
+    Yields:
+        SortStep: A "split", "run" or "pass" step
+    Returns:
+        list or numpy.ndarray: The sorted array, of the same kind as arr (returned via StopIteration)
+    """
+
+    workers = workers or PARALLEL_SORT_WORKERS
+    values = np.asarray(arr)
+    if values.dtype.kind not in "biuf":
+        raise TypeError("the parallel engine can only sort numbers")
+    length = len(values)
+    if not length:
+        return working_copy(arr)
+
+    # SETUP: two shared blocks of the same size; each phase reads one and writes the other
+    dtype = values.dtype.str
+    executor = parallel_executor(workers)
+    blocks = [shared_memory.SharedMemory(create=True, size=values.nbytes) for _ in range(2)]
+    buffers = [np.ndarray((length,), dtype=dtype, buffer=block.buf) for block in blocks]
+    names = [block.name for block in blocks]
+    source, target = 0, 1
+    pending = {} # running task -> (start, end) of the run it works on
+
+    try:
+        buffers[source][:] = values
+
+    # SORTING PARTS: one task per part, all running at the same time
+        part_count = min(length, max(workers, PARALLEL_SORT_MIN_PARTS))
+        bounds = np.linspace(0, length, part_count + 1).astype(np.int64).tolist()
+        runs = [(bounds[i], bounds[i + 1] - 1) for i in range(part_count)]
+        yield SortStep("split", (0, length - 1), 0, parts=runs)
+
+        for start, end in runs:
+            future = executor.submit(sort_shared_part, names[source], names[target], length, dtype, start, end + 1)
+            pending[future] = (start, end)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                start, end = pending.pop(future)
+                future.result() # raises here if the worker failed
+                writes = None
+                if record_writes:
+                    writes = changed_values(buffers[source][start:end + 1], buffers[target][start:end + 1], start)
+                yield SortStep("run", (start, end), 0, writes, parts=runs)
+        source, target = target, source
+
+    # MERGE ROUNDS: merge neighbouring runs in pairs, each pair split between the workers
+        merge_round = 0
+        while len(runs) > 1:
+            merge_round += 1
+            next_runs = []
+            tasks_left = {} # start of a pair -> its tasks still running
+
+            for left, right in zip(runs[0::2], runs[1::2]):
+                start, mid, end = left[0], right[0], right[1] + 1
+                # give each pair a share of the workers in proportion to its size
+                task_count = max(1, min(end - start, round(workers * (end - start) / length)))
+                cuts = np.linspace(0, end - start, task_count + 1).astype(np.int64).tolist()
+                for first, last in zip(cuts[:-1], cuts[1:]):
+                    future = executor.submit(
+                        merge_shared_runs, names[source], names[target], length, dtype, start, mid, end, first, last
+                    )
+                    pending[future] = (start, end - 1)
+                tasks_left[start] = task_count
+                next_runs.append((start, end - 1))
+
+            if len(runs) % 2:
+                # the last run has no partner this round, so it is only copied across
+                start, end = runs[-1]
+                buffers[target][start:end + 1] = buffers[source][start:end + 1]
+                next_runs.append(runs[-1])
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start, end = pending.pop(future)
+                    future.result()
+                    tasks_left[start] -= 1
+                    if not tasks_left[start]:
+                        writes = None
+                        if record_writes:
+                            writes = changed_values(
+                                buffers[source][start:end + 1], buffers[target][start:end + 1], start
+                            )
+                        yield SortStep("pass", (start, end), merge_round, writes, parts=runs)
+
+            runs = next_runs
+            source, target = target, source
+
+        result = buffers[source].copy()
+    finally:
+        # let running tasks finish before freeing the memory they use (e.g. when the generator is closed early)
+        wait(pending)
+        del buffers
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    return same_kind_as(result, arr)
+
+
+def parallel_merge_sort(arr, workers=None):
+    """
+    This function sorts an array with parallel_merge_sort_steps when only the
+    result is wanted, without recording what each step changes.
+    
+    Args:
+        arr (list or numpy.ndarray): Numbers to sort
+        workers (int, optional): Number of worker processes (default PARALLEL_SORT_WORKERS)
+        
+    Returns:
+        list or numpy.ndarray: The sorted array
+    """
+
+    stepper = parallel_merge_sort_steps(arr, workers, record_writes=False)
+    while True:
+        try:
+            next(stepper)
+        except StopIteration as e:
+            return e.value
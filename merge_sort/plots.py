@@ -0,0 +1,463 @@
+"""
+Merge Sort Visualizer - Plots
+Drawing the array as a bar chart (or a binned view for large arrays), both as
+Plotly figures and as prebuilt figure JSON for the per-step fast path. Plotly
+is only imported when a figure is first built.
+"""
+import json
+from functools import lru_cache
+
+import numpy as np
+
+from merge_sort.arrays import format_array_preview
+from merge_sort.metrics import METRICS
+
+# --------------------------------------------------------------------------------------------------
+# VISUALIZATION (BAR PLOT) FUNCTION
+# --------------------------------------------------------------------------------------------------
+
+BAR_TEXT_MAX_LENGTH = 50         # bars only show their value as text up to this many bars
+LARGE_ARRAY_THRESHOLD = 1_000    # above this many values the plot switches to the binned WebGL view
+PLOT_PIXEL_COLUMNS = 1_000       # number of min/max columns drawn in the binned view
+
+DEFAULT_COLOR = "#4ECDC4" # Teal (no highlighting)
+SINGLE_COLOR = "#FF8000"  # Orange (single element being examined)
+LEFT_COLOR = "#FF6B6B"    # Red (left half)
+RIGHT_COLOR = "#FFD93D"   # Yellow (right half)
+IDLE_COLOR = "#8C8C8C"    # Grey (not involved in the current step)
+# One colour per part of the array being worked on at the same time (parallel engine), reused in turn
+PART_COLORS = ["#FF6B6B", "#FFD93D", "#6A4C93", "#1982C4", "#8AC926", "#FF924C", "#C5CA30", "#F15BB5"]
+
+# Bar colours and hover labels by role, indexed by the codes below (used to fill runs of bars in bulk)
+ROLE_IDLE, ROLE_LEFT, ROLE_RIGHT, ROLE_SINGLE, ROLE_PART = range(5) # part i uses code ROLE_PART + i % len(PART_COLORS)
+PALETTE_COLORS = [IDLE_COLOR, LEFT_COLOR, RIGHT_COLOR, SINGLE_COLOR] + PART_COLORS
+PALETTE_LABELS = ["none", "left", "right", ""] + [f"part {i + 1}" for i in range(len(PART_COLORS))]
+PALETTE_COLOR_ARRAY = np.array(PALETTE_COLORS)
+PALETTE_LABEL_ARRAY = np.array(PALETTE_LABELS)
+
+# Small stand-in for Plotly's default template (about 7 KB per figure) used by the fast plot path
+FAST_PLOT_TEMPLATE = dict(
+    layout=dict(
+        font=dict(color="#2a3f5f"),
+        paper_bgcolor="white",
+        plot_bgcolor="#E5ECF6",
+        hovermode="closest",
+        xaxis=dict(gridcolor="white", linecolor="white", zerolinecolor="white"),
+        yaxis=dict(gridcolor="white", linecolor="white", zerolinecolor="white"),
+    )
+)
+
+
+def bar_colors(length, highlight_range=None, finished=False, parts=None):
+    """
+    This function decides the colour and hover label of every bar based on
+    which part of the array the current step is working on.
+    
+    Args:
+        length (int): Number of bars
+        highlight_range (tuple, optional): (start, end) indices to highlight
+        finished (bool): Whether sorting is complete
+        parts (list, optional): (start, end) of parts worked on at the same
+            time; each gets its own colour and replaces the highlight
+        
+    Returns:
+        tuple: (colors, hover_labels) with one entry per bar; lists, or numpy
+               arrays when length is above LARGE_ARRAY_THRESHOLD
+    """
+
+    runs = bar_runs(length, highlight_range, parts)
+    if runs is None:
+        # No highlighting - use default colour
+        label = "sorted" if finished else "unsorted"
+        if length > LARGE_ARRAY_THRESHOLD:
+            return np.full(length, DEFAULT_COLOR), np.full(length, label)
+        return [DEFAULT_COLOR] * length, [label] * length
+    return fill_runs(length, runs)
+
+
+def bar_runs(length, highlight_range=None, parts=None):
+    """
+    This function splits the bars into runs that share a role (and so a
+    colour), based on which part of the array the current step is working on.
+    
+    Args:
+        length (int): Number of bars
+        highlight_range (tuple, optional): (start, end) indices to highlight
+        parts (list, optional): (start, end) of parts worked on at the same time
+        
+    Returns:
+        list or None: (role code, number of bars) pairs covering every bar in
+                      order, or None when nothing is highlighted
+    """
+
+    if not highlight_range and not parts:
+        return None
+
+    if parts:
+        #  one run per part in its own colour, with grey runs for any gaps between them
+        runs = []
+        position = 0
+        for number, (start, end) in enumerate(parts):
+            runs.append((ROLE_IDLE, start - position))
+            runs.append((ROLE_PART + number % len(PART_COLORS), end - start + 1))
+            position = end + 1
+        runs.append((ROLE_IDLE, length - position))
+        return runs
+
+    start, end = highlight_range
+    mid = start + (end - start + 1) // 2 #  Calculate midpoint
+
+    #  Split the bars into runs that share a colour: [0,start) | [start,mid) | [mid,end] | (end,length)
+    if start == end:
+        #  single element being examined
+        return [(ROLE_IDLE, start), (ROLE_SINGLE, 1), (ROLE_IDLE, length - end - 1)]
+    return [
+        (ROLE_IDLE, start),
+        (ROLE_LEFT, mid - start),
+        (ROLE_RIGHT, end - mid + 1),
+        (ROLE_IDLE, length - end - 1),
+    ]
+
+
+def fill_runs(length, runs):
+    """
+    This function expands runs of bars that share a role into one colour and
+    hover label per bar.
+    
+    Args:
+        length (int): Number of bars
+        runs (iterable): (role code, number of bars) pairs covering every bar in order
+        
+    Returns:
+        tuple: (colors, hover_labels); lists, or numpy arrays when length is
+               above LARGE_ARRAY_THRESHOLD
+    """
+
+    if length > LARGE_ARRAY_THRESHOLD:
+        # fill each run of a preallocated numpy array in one slice assignment
+        colors = np.empty(length, dtype=PALETTE_COLOR_ARRAY.dtype)
+        hover_labels = np.empty(length, dtype=PALETTE_LABEL_ARRAY.dtype)
+        position = 0
+        for code, count in runs:
+            colors[position : position + count] = PALETTE_COLOR_ARRAY[code]
+            hover_labels[position : position + count] = PALETTE_LABEL_ARRAY[code]
+            position += count
+        return colors, hover_labels
+
+    colors = []
+    hover_labels = []
+    for code, count in runs:
+        colors += [PALETTE_COLORS[code]] * count
+        hover_labels += [PALETTE_LABELS[code]] * count
+    return colors, hover_labels
+
+
+def envelope_segments(arr, highlight_range=None, finished=False, parts=None):
+    """
+    This function splits the indices of a large array into a fixed number of
+    columns and finds the smallest and largest value in each one, grouped by
+    highlight colour. Each column becomes a vertical segment from its smallest
+    to its largest value.
+    
+    Args:
+        arr (list): The array to visualize
+        highlight_range (tuple, optional): (start, end) indices to highlight
+        finished (bool): Whether sorting is complete
+        parts (list, optional): (start, end) of parts worked on at the same time, each in its own colour
+        
+    Returns:
+        list: (color, label, x, y) per colour group, where x and y are numpy
+              arrays of segment end points separated by NaN gaps
+    """
+
+    values = np.asarray(arr)
+    length = len(values)
+    columns = min(PLOT_PIXEL_COLUMNS, length)
+
+    # First index of each column, and the smallest/largest value inside it
+    column_starts = np.linspace(0, length, columns, endpoint=False).astype(np.int64)
+    lows = np.minimum.reduceat(values, column_starts)
+    highs = np.maximum.reduceat(values, column_starts)
+
+    # Colour each column by where its first index falls relative to the highlighted range (or parts)
+    if parts:
+        in_parts = [(column_starts >= start) & (column_starts <= end) for start, end in parts]
+        groups = [(IDLE_COLOR, "none", ~np.logical_or.reduce(in_parts))] + [
+            (PART_COLORS[number % len(PART_COLORS)], f"part {number + 1}", in_part)
+            for number, in_part in enumerate(in_parts)
+        ]
+    elif highlight_range:
+        start, end = highlight_range
+        mid = start + (end - start + 1) // 2 #  Calculate midpoint
+        groups = [
+            (IDLE_COLOR, "none", (column_starts < start) | (column_starts > end)),
+            (LEFT_COLOR, "left", (column_starts >= start) & (column_starts < mid)),
+            (RIGHT_COLOR, "right", (column_starts >= mid) & (column_starts <= end)),
+        ]
+    else:
+        label = "sorted" if finished else "unsorted"
+        groups = [(DEFAULT_COLOR, label, np.ones(columns, dtype=bool))]
+
+    segments = []
+    for color, label, in_group in groups:
+        # each column becomes the segment (x, low) -> (x, high), separated by gaps
+        x = np.repeat(column_starts[in_group], 3).astype(float)
+        y = np.column_stack((lows[in_group], highs[in_group], np.full(in_group.sum(), np.nan))).ravel()
+        x[2::3] = np.nan
+        segments.append((color, label, x, y))
+
+    return segments
+
+
+def plot_layout(arr, finished=False):
+    """
+    This function returns the layout settings shared by every chart.
+    
+    Args:
+        arr (list): The array being visualized
+        finished (bool): Whether sorting is complete
+        
+    Returns:
+        dict: Keyword arguments for Figure.update_layout
+    """
+
+    return dict(
+        showlegend=False,
+        yaxis_title="Value",
+        height=400,
+        xaxis=dict(
+            showticklabels=False,
+            showgrid=False,
+            title=f"Finished Sorted Array: {format_array_preview(arr)}" if finished else "",
+        ),
+    )
+
+
+def create_bar_plot(arr, highlight_range=None, finished=False, parts=None):
+    """
+    This function generates a Plotly bar chart where different sections
+    can be highlighted with different colors to show the sorting process.
+    
+    Args:
+        arr (list): The array to visualize
+        highlight_range (tuple, optional): (start, end) indices to highlight
+        finished (bool): Whether sorting is complete
+        parts (list, optional): (start, end) of parts worked on at the same time
+        
+    Returns:
+        plotly.graph_objects.Figure: The configured bar chart
+    """
+
+    import plotly.graph_objects as go # imported on first use, so the package loads without plotly
+
+    with METRICS.measure("create_bar_plot"):
+        # Big arrays would mean one bar (plus colour and label) per value, so draw a binned view instead
+        if len(arr) > LARGE_ARRAY_THRESHOLD:
+            return create_envelope_plot(arr, highlight_range, finished, parts)
+
+        colors, hover_labels = bar_colors(len(arr), highlight_range, finished, parts)
+
+        # Create the bar chart
+        fig = go.Figure(
+            data=[
+                go.Bar(
+                    x=list(range(len(arr))),        # X-AXIS: array indices
+                    y=arr,                          # Y-AXIS: array values
+                    marker_color=colors,            # Bar colors
+                    customdata=hover_labels,        # Custom hover text
+                    hovertemplate="%{y}<br>%{customdata}<extra></extra>",
+                    text=arr if len(arr) <= BAR_TEXT_MAX_LENGTH else None, # Show value on each bar (small arrays only)
+                    textposition="inside",          # Place text inside bars
+                    textfont=dict(                  # Manage text font styling
+                        color="white",
+                        size=14,
+                        family="Arial",
+                    ),
+                )
+            ]
+        )
+
+        # Configure chart layout
+        fig.update_layout(**plot_layout(arr, finished))
+
+        return fig
+
+
+def create_envelope_plot(arr, highlight_range=None, finished=False, parts=None):
+    """
+    This function draws large arrays as one vertical min/max line per column
+    (see envelope_segments), using WebGL traces. The amount of data sent to the
+    browser stays the same however long the array is.
+    
+    Args:
+        arr (list): The array to visualize
+        highlight_range (tuple, optional): (start, end) indices to highlight
+        finished (bool): Whether sorting is complete
+        parts (list, optional): (start, end) of parts worked on at the same time
+        
+    Returns:
+        plotly.graph_objects.Figure: The configured chart
+    """
+
+    import plotly.graph_objects as go
+
+    fig = go.Figure(
+        data=[
+            go.Scattergl(
+                x=x,
+                y=y,
+                mode="lines",
+                line=dict(color=color, width=2),
+                name=label,
+                hovertemplate=f"%{{y}}<br>{label}<extra></extra>",
+            )
+            for color, label, x, y in envelope_segments(arr, highlight_range, finished, parts)
+        ]
+    )
+    fig.update_layout(**plot_layout(arr, finished))
+
+    return fig
+
+# --------------------------------------------------------------------------------------------------
+# FAST PLOT PATH (PREBUILT FIGURE JSON)
+# --------------------------------------------------------------------------------------------------
+
+class FastFigure:
+    """
+    Plotly figure JSON assembled by render_plot. gr.Plot only needs an object
+    with a to_json() method, so this is sent as-is without going through
+    plotly.graph_objects and its property validation.
+    """
+
+    __slots__ = ("json",)
+
+    def __init__(self, json_text):
+        self.json = json_text
+
+    def to_json(self):
+        return self.json
+
+
+@lru_cache(maxsize=None)
+def fast_layout():
+    """
+    This function builds (once per process) the layout used by render_plot.
+    It goes through Plotly a single time so it is validated, and swaps the
+    large default template for FAST_PLOT_TEMPLATE to keep every figure small.
+    
+    Returns:
+        dict: Plotly layout as plain JSON-ready data
+    """
+
+    import plotly.graph_objects as go
+
+    layout = go.Layout(template=FAST_PLOT_TEMPLATE, **plot_layout([]))
+    return layout.to_plotly_json()
+
+
+@lru_cache(maxsize=32)
+def bar_positions(length):
+    """
+    Returns the x positions (0 to length-1) of the bars, shared between steps.
+    """
+
+    return list(range(length))
+
+
+def json_values(values):
+    """
+    Converts numpy arrays to plain lists (NaN becomes None) so they can be
+    written with json.dumps; lists are returned unchanged.
+    """
+
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind == "f" and np.isnan(values).any():
+            return np.where(np.isnan(values), None, values).tolist()
+        return values.tolist()
+    return values
+
+
+def plot_data(arr, highlight_range=None, finished=False, parts=None):
+    """
+    This function builds the traces of the chart for one step as plain
+    JSON-ready data: one bar trace, or the binned min/max lines of
+    create_envelope_plot for large arrays.
+    
+    Args:
+        arr (list): The array to visualize
+        highlight_range (tuple, optional): (start, end) indices to highlight
+        finished (bool): Whether sorting is complete
+        parts (list, optional): (start, end) of parts worked on at the same time
+        
+    Returns:
+        list: Plotly trace dictionaries
+    """
+
+    if len(arr) > LARGE_ARRAY_THRESHOLD:
+        return [
+            {
+                "type": "scattergl",
+                "x": json_values(x),
+                "y": json_values(y),
+                "mode": "lines",
+                "line": {"color": color, "width": 2},
+                "name": label,
+                "hovertemplate": f"%{{y}}<br>{label}<extra></extra>",
+            }
+            for color, label, x, y in envelope_segments(arr, highlight_range, finished, parts)
+        ]
+
+    values = json_values(arr)
+    colors, hover_labels = bar_colors(len(arr), highlight_range, finished, parts)
+    bar = {
+        "type": "bar",
+        "x": bar_positions(len(arr)),
+        "y": values,
+        "marker": {"color": colors},
+        "customdata": hover_labels,
+        "hovertemplate": "%{y}<br>%{customdata}<extra></extra>",
+        "textposition": "inside",
+        "textfont": {"color": "white", "size": 14, "family": "Arial"},
+    }
+    if len(arr) <= BAR_TEXT_MAX_LENGTH:
+        bar["text"] = values
+    return [bar]
+
+
+def step_layout(arr, finished=False):
+    """
+    Returns the fast_layout, with the final array as the axis title once sorting is finished.
+    """
+
+    layout = fast_layout()
+    if finished:
+        # only the finished chart has an axis title, so copy just the parts that change
+        layout = dict(layout, xaxis=dict(layout["xaxis"], title={"text": plot_layout(arr, True)["xaxis"]["title"]}))
+    return layout
+
+
+def render_plot(arr, highlight_range=None, finished=False, parts=None):
+    """
+    This function is the per-step version of create_bar_plot. The layout is
+    built once and reused, and each step only fills in its values, colours and
+    labels before writing the figure straight to JSON.
+    
+    Args:
+        arr (list): The array to visualize
+        highlight_range (tuple, optional): (start, end) indices to highlight
+        finished (bool): Whether sorting is complete
+        parts (list, optional): (start, end) of parts worked on at the same time
+        
+    Returns:
+        FastFigure: The chart, ready to be sent to a gr.Plot
+    """
+
+    # assembling the figure and writing it to JSON are timed separately
+    with METRICS.measure("render_plot/figure"):
+        data = plot_data(arr, highlight_range, finished, parts)
+        layout = step_layout(arr, finished)
+
+    with METRICS.measure("render_plot/serialize"):
+        figure_json = json.dumps({"data": data, "layout": layout})
+    METRICS.observe_payload("plot", len(figure_json))
+    return FastFigure(figure_json)
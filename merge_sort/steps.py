@@ -0,0 +1,299 @@
+"""
+Merge Sort Visualizer - Sort Steps
+The SortStep record every sort engine yields, and the functions that turn a
+step into the message shown to the user.
+"""
+import heapq
+from bisect import bisect_left, bisect_right
+
+from merge_sort.arrays import format_array_preview
+
+# --------------------------------------------------------------------------------------------------
+# SORT STEPS AND THEIR MESSAGES (SHARED BY EVERY SORT ENGINE)
+# --------------------------------------------------------------------------------------------------
+
+MESSAGE_MAX_COMPARISONS = 50     # merge messages list at most this many comparisons
+
+
+class SortStep:
+    """
+    One step of a sort engine. Steps only carry structured data; the text shown
+    to the user is produced by render_step_message when the step is displayed.
+
+    Attributes:
+        kind (str): Step type ("split", "base", "merge", "run", "pass", "natural_run",
+                    "kway_split" or "kway_merge")
+        highlight_range (tuple): (start_index, end_index) indicating highlighted section
+        depth (int): Recursion depth of the sub-array (0 for the whole array)
+        writes (list): (index, old_value, new_value) changes this step makes to the array
+        comparisons (list): (left_index, right_index, took_left) for the first
+                            MESSAGE_MAX_COMPARISONS comparisons of a merge, as
+                            positions in the full array
+        comparison_count (int): How many comparisons a merge made in total
+        parts (list): (start_index, end_index) of each part of the array being
+                      worked on at the same time, drawn in its own colour
+                      (parallel, natural-run and k-way engines)
+        index (int or None): Position of the step when read back out of a StepTrace
+    """
+
+    __slots__ = ("kind", "highlight_range", "depth", "writes", "comparisons", "comparison_count", "parts", "index")
+
+    def __init__(
+        self, kind, highlight_range, depth, writes=None, comparisons=None, comparison_count=0, parts=None, index=None
+    ):
+        self.kind = kind
+        self.highlight_range = highlight_range
+        self.depth = depth
+        self.writes = writes if writes is not None else []
+        self.comparisons = comparisons if comparisons is not None else []
+        self.comparison_count = comparison_count
+        self.parts = parts if parts is not None else []
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, SortStep) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__ if name != "index"
+        )
+
+
+BASE_MESSAGE = "✨ There is only 1 element in this half, so it's already sorted and perfect!"
+
+
+def split_message(left, right, counter):
+    """
+    This function describes a split step.
+    
+    Args:
+        left (list): Left half
+        right (list): Right half
+        counter (int): Recursion depth of the split (0 for the whole array)
+        
+    Returns:
+        str: The message shown for the step
+    """
+
+    split_text = "next " if counter != 0 else "" #if splitting second half, add "next" to existing sentence for better UX
+    return (
+        f"🔪 CHOP! Splitting the {split_text}array in half...\n"
+        f"        📦 Left half consists of: {format_array_preview(left)}\n"
+        f"        📦 Right half consists of: {format_array_preview(right)}"
+    )
+
+
+def merge_message(left, right, result, comparisons, comparison_count):
+    """
+    This function describes a merge step, listing the first few comparisons.
+    
+    Args:
+        left (list): Sorted left half
+        right (list): Sorted right half
+        result (list): The merged array
+        comparisons (list): (left_value, right_value, took_left) for the first
+                            MESSAGE_MAX_COMPARISONS comparisons
+        comparison_count (int): How many comparisons the merge made in total
+        
+    Returns:
+        str: The message shown for the step
+    """
+
+    comparison_text = "Based on the comparison, "
+    for left_value, right_value, took_left in comparisons:
+        comparison_text += (
+            f"\n Comparing {left_value} and {right_value}, "
+            f"I added {left_value if took_left else right_value} from {'left' if took_left else 'right'} half, "
+        )
+
+    if comparison_count > len(comparisons):
+        comparison_text += f"\n ...and {comparison_count - len(comparisons)} more comparisons, "
+
+    comparison_text += (
+        f"(all to the start of the sorted array) and added the remaining at the end "
+        f"so that the final array for this half is {format_array_preview(result)}"
+    )
+    return (
+        f"🤔 Comparing and merging left: {format_array_preview(left)} "
+        f"and right: {format_array_preview(right)}...\n{comparison_text}"
+    )
+
+
+def values_before(step, array):
+    """
+    This function puts back the old values of a step's writes to see the
+    highlighted range as it looked before the step.
+    
+    Args:
+        step (SortStep): The step
+        array (list): The full array after the step's writes
+        
+    Returns:
+        list: Values of the highlighted range before the step
+    """
+
+    start, end = step.highlight_range
+    before = list(array[start:end + 1])
+    for index, old, _ in step.writes:
+        before[index - start] = old
+    return before
+
+
+def render_step_message(step, array):
+    """
+    This function writes the message for a step, reading the values it talks
+    about from the array as it looks right after the step.
+    
+    Args:
+        step (SortStep): The step to describe
+        array (list): The full array after the step's writes
+        
+    Returns:
+        str: The message shown for the step
+    """
+
+    if step.kind == "base":
+        return BASE_MESSAGE
+    if step.kind in ("kway_split", "kway_merge"):
+        return kway_step_message(step, array)
+    if step.kind == "natural_run" or (step.kind == "merge" and step.parts):
+        return natural_step_message(step, array)
+    if step.parts:
+        return parallel_step_message(step, array)
+
+    start, end = step.highlight_range
+    mid = start + (end - start + 1) // 2 # same split point the engines use
+
+    if step.kind == "split":
+        return split_message(array[start:mid], array[mid:end + 1], step.depth)
+
+    # a merge has already written its result, so put the old values back to see the two halves
+    before = values_before(step, array)
+
+    comparisons = [
+        (before[left_index - start], before[right_index - start], took_left)
+        for left_index, right_index, took_left in step.comparisons
+    ]
+    return merge_message(
+        before[:mid - start], before[mid - start:], array[start:end + 1], comparisons, step.comparison_count
+    )
+
+
+def parallel_step_message(step, array):
+    """
+    This function describes a step of the parallel engine, where several
+    parts of the array are handled by different workers at the same time.
+    
+    Args:
+        step (SortStep): A "split", "run" or "pass" step with parts
+        array (list): The full array after the step's writes
+        
+    Returns:
+        str: The message shown for the step
+    """
+
+    start, end = step.highlight_range
+
+    if step.kind == "split":
+        lines = [f"🔪 CHOP! Splitting the array into {len(step.parts)} parts so they can be sorted at the same time..."]
+        for number, (part_start, part_end) in enumerate(step.parts, start=1):
+            lines.append(f"        📦 Part {number} consists of: {format_array_preview(array[part_start:part_end + 1])}")
+        return "\n".join(lines)
+
+    if step.kind == "run":
+        number = step.parts.index((start, end)) + 1
+        return f"👷 A worker finished sorting part {number}: {format_array_preview(array[start:end + 1])}"
+
+    # a pass has already written the merged values, so put the old values back to see the two runs
+    before = values_before(step, array)
+    mid = next(part_end for part_start, part_end in step.parts if part_start == start) + 1
+    return (
+        f"🔗 Merge round {step.depth}: workers merged {format_array_preview(before[:mid - start])} "
+        f"and {format_array_preview(before[mid - start:])} together, "
+        f"so this part is now {format_array_preview(array[start:end + 1])}"
+    )
+
+
+def natural_step_message(step, array):
+    """
+    This function describes a step of the natural-run engine: finding a run
+    of values that were already in order, or a galloping merge of two runs.
+    Everything it reports is worked out again from the values themselves.
+    
+    Args:
+        step (SortStep): A "natural_run" step, or a "merge" step with the two runs as parts
+        array (list): The full array after the step's writes
+        
+    Returns:
+        str: The message shown for the step
+    """
+
+    start, end = step.highlight_range
+    before = values_before(step, array)
+    result = format_array_preview(array[start:end + 1])
+
+    if step.kind == "natural_run":
+        # the run found in the data is the longest strictly descending or non-descending start
+        descending = len(before) > 1 and before[1] < before[0]
+        found = 1
+        while found < len(before) and (before[found] < before[found - 1]) == descending:
+            found += 1
+
+        if descending:
+            message = f"🔎 Found a run of {found} values in reverse order and flipped it"
+        else:
+            message = f"🔎 Found a run of {found} values that were already in order"
+        if found < len(before):
+            message += f", then added the next {len(before) - found} values to it with insertion sort"
+        return f"{message}: {result}"
+
+    (left_start, left_end), (right_start, _) = step.parts[0], step.parts[1]
+    left, right = before[:left_end - left_start + 1], before[right_start - start:]
+
+    # values at the start of the left run and the end of the right run that did not have to move
+    left_in_place = bisect_right(left, right[0])
+    right_in_place = len(right) - bisect_left(right, left[-1])
+    return (
+        f"🏃 Galloping merge of the runs {format_array_preview(left)} and {format_array_preview(right)}...\n"
+        f"        The first {left_in_place} values of the left run and the last {right_in_place} values of the "
+        f"right run were already in place, so only the {len(before) - left_in_place - right_in_place} values "
+        f"in between were merged. The merged run is {result}"
+    )
+
+
+def kway_step_message(step, array):
+    """
+    This function describes a step of the k-way engine: splitting a
+    sub-array into k parts, or merging k sorted parts at once. For a merge,
+    the first few values taken are worked out again from the parts.
+    
+    Args:
+        step (SortStep): A "kway_split" or "kway_merge" step with the k parts as parts
+        array (list): The full array after the step's writes
+        
+    Returns:
+        str: The message shown for the step
+    """
+
+    start, end = step.highlight_range
+
+    if step.kind == "kway_split":
+        split_text = "next " if step.depth != 0 else ""
+        lines = [f"🔪 CHOP! Splitting the {split_text}array into {len(step.parts)} parts..."]
+        for number, (part_start, part_end) in enumerate(step.parts, start=1):
+            lines.append(f"        📦 Part {number} consists of: {format_array_preview(array[part_start:part_end + 1])}")
+        return "\n".join(lines)
+
+    # a merge has already written its result, so put the old values back to see the parts
+    before = values_before(step, array)
+    parts = [before[part_start - start : part_end - start + 1] for part_start, part_end in step.parts]
+
+    # replay the merge with the part number next to every value (equal values come from the earlier part first)
+    numbered = [[(value, number) for value in part] for number, part in enumerate(parts, start=1)]
+    taken_text = "The heap always holds the front value of every part, and the smallest one is taken next: "
+    for count, (value, number) in enumerate(heapq.merge(*numbered)):
+        if count == MESSAGE_MAX_COMPARISONS:
+            taken_text += f"\n ...and {len(before) - count} more values, "
+            break
+        taken_text += f"\n Took {value} from part {number}, "
+
+    taken_text += f"so the final array for these {len(parts)} parts is {format_array_preview(array[start:end + 1])}"
+    part_text = ", ".join(format_array_preview(part) for part in parts)
+    return f"🧺 Merging {len(parts)} sorted parts at once: {part_text}...\n{taken_text}"
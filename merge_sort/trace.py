@@ -0,0 +1,404 @@
+"""
+Merge Sort Visualizer - Step Trace
+A compact, serializable record of every step of a sort, and a cursor that
+moves through it.
+"""
+import sys
+from array import array
+from bisect import bisect_right
+
+from merge_sort.arrays import is_numpy_array, working_copy
+from merge_sort.engines import get_engine
+from merge_sort.steps import SortStep, render_step_message
+
+# --------------------------------------------------------------------------------------------------
+# STEP TRACE (PRECOMPUTED, SERIALIZABLE RECORD OF EVERY STEP)
+# --------------------------------------------------------------------------------------------------
+
+STEP_KINDS = ("split", "base", "merge", "run", "pass", "natural_run", "kway_split", "kway_merge") # step types a trace can hold, stored as their index in this tuple
+TRACE_CHECKPOINT_MIN_WRITES = 256        # fewest writes between two full-array checkpoints
+
+
+def value_store(values):
+    """
+    This function picks the most compact empty container that can hold the
+    given kind of values: a typed array for plain ints or floats (8 bytes per
+    value), or a list for anything else.
+    
+    Args:
+        values (list): Example values (usually the array being sorted)
+        
+    Returns:
+        array or list: An empty container for values of that kind
+    """
+
+    if is_numpy_array(values):
+        # numpy arrays already know their type, so there is no need to look at every value
+        if values.dtype.kind in "iub":
+            return array("Q" if values.dtype.kind == "u" and values.dtype.itemsize == 8 else "q")
+        if values.dtype.kind == "f":
+            return array("d")
+        return []
+    if all(type(value) is int for value in values):
+        if not values or (-2**63 <= min(values) and max(values) < 2**63):
+            return array("q")
+    elif all(type(value) is float for value in values):
+        return array("d")
+    return []
+
+
+def container_bytes(values):
+    """
+    Returns how many bytes a typed array, numpy array or list takes up (for
+    lists, only the list itself, since its values may be shared).
+    """
+
+    if isinstance(values, array):
+        return len(values) * values.itemsize
+    if is_numpy_array(values):
+        return values.nbytes
+    return sys.getsizeof(values)
+
+
+class StepTrace:
+    """
+    This class runs the merge sort once and stores every step as a compact
+    record (kind, highlighted range, depth, array changes, comparisons, parts) in flat
+    arrays, so a session can move forward, backward or to any step without
+    re-running the sort. Unlike a live generator it can be pickled, copied and
+    shared between workers. Messages are only written when a step is shown,
+    and are kept so showing the step again costs nothing.
+    """
+
+    def __init__(self, arr, engine="recursive", **options):
+        """
+        Builds the trace in a single pass over the chosen engine's steps.
+
+        Args:
+            arr (list): List of integers to sort
+            engine (str): Key of the sort engine in SORT_ENGINES (see get_engine)
+            **options: Engine settings, such as ways=8 for the k-way engine
+        """
+
+        # the unsorted array (state before the first step); numpy arrays are kept
+        # as they are, so a memory-mapped file is read straight from the mapping
+        self.initial = arr if is_numpy_array(arr) else list(arr)
+
+        self._kinds = array("B")          # kind of each step (index into STEP_KINDS)
+        self._starts = array("q")         # start of the highlighted range of each step
+        self._ends = array("q")           # end of the highlighted range of each step
+        self._depths = array("H")         # recursion depth of each step
+        self._write_offsets = array("q", [0]) # position k's writes live in [offsets[k], offsets[k+1])
+        self._write_indices = array("q")  # array index changed by each write
+        self._write_old = value_store(arr) # value before each write
+        self._write_new = value_store(arr) # value after each write
+        self._comparison_offsets = array("q", [0]) # step k's comparisons live in [offsets[k], offsets[k+1])
+        self._comparison_sides = array("B")  # 1 if a comparison took the left value, 0 if the right
+        self._comparison_counts = array("q") # total comparisons made by each step
+        self._part_offsets = array("q", [0]) # step k's parts live in [offsets[k], offsets[k+1])
+        self._part_starts = array("q")    # first index of each part
+        self._part_ends = array("q")      # last index of each part
+        self._messages = {}               # message of each step that has been shown so far
+        self.cache_key = None             # content key of (arr, engine, options) when the trace is kept in the trace cache
+        self._positions = {}              # (kind, depth) and (kind, None) -> positions of matching steps, in order
+
+        # Full copies of the array taken every so often, so any step can be rebuilt
+        # without replaying the whole trace. A new one is only taken once at least
+        # len(arr) writes have happened since the last, so they never cost more
+        # memory than the writes themselves.
+        self._checkpoint_positions = array("q", [-1]) # position each checkpoint was taken at
+        self._checkpoints = [self.initial]            # array as it looks at that position
+
+        working = working_copy(arr) # array as it looks after the latest step
+        writes_since_checkpoint = 0
+        checkpoint_every = max(len(arr), TRACE_CHECKPOINT_MIN_WRITES)
+        stepper = get_engine(engine, **options)(arr)
+
+        while True:
+            try:
+                step = next(stepper)
+            except StopIteration as e:
+                self._write_offsets.append(len(self._write_indices)) # nothing changes when finishing
+                self.final = e.value
+                break
+
+            for index, old, new in step.writes:
+                self._write_indices.append(index)
+                self._write_old.append(old)
+                self._write_new.append(new)
+                working[index] = new
+            self._write_offsets.append(len(self._write_indices))
+
+            self._kinds.append(STEP_KINDS.index(step.kind))
+            self._starts.append(step.highlight_range[0])
+            self._ends.append(step.highlight_range[1])
+            self._depths.append(step.depth)
+            for key in ((step.kind, step.depth), (step.kind, None)):
+                self._positions.setdefault(key, array("q")).append(len(self._kinds) - 1)
+
+            # the compared positions follow from which side each comparison took, so only that is stored
+            self._comparison_sides.extend(1 if took_left else 0 for _, _, took_left in step.comparisons)
+            self._comparison_offsets.append(len(self._comparison_sides))
+            self._comparison_counts.append(step.comparison_count)
+
+            for part_start, part_end in step.parts:
+                self._part_starts.append(part_start)
+                self._part_ends.append(part_end)
+            self._part_offsets.append(len(self._part_starts))
+
+            writes_since_checkpoint += len(step.writes)
+            if writes_since_checkpoint >= checkpoint_every:
+                self._checkpoint_positions.append(len(self._kinds) - 1)
+                self._checkpoints.append(working_copy(working))
+                writes_since_checkpoint = 0
+
+    def __len__(self):
+        return len(self._kinds)
+
+    def nbytes(self):
+        """
+        Returns roughly how many bytes the trace takes up: its columns,
+        checkpoints and the messages written so far (used to bound the trace cache).
+        """
+
+        columns = [
+            self._kinds, self._starts, self._ends, self._depths, self._write_offsets, self._write_indices,
+            self._write_old, self._write_new, self._comparison_offsets, self._comparison_sides,
+            self._comparison_counts, self._part_offsets, self._part_starts, self._part_ends,
+            self._checkpoint_positions, *self._checkpoints, *self._positions.values(),
+        ]
+        total = sum(container_bytes(column) for column in columns)
+        return total + sum(sys.getsizeof(message) for message in self._messages.values())
+
+    def __getitem__(self, index):
+        """
+        Returns the SortStep at the given position (negative indices count from the end).
+        """
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("step index out of range")
+
+        start, end = self._starts[index], self._ends[index]
+
+        # rebuild the compared positions by walking both halves from their first value
+        comparisons = []
+        left_index, right_index = start, start + (end - start + 1) // 2
+        for w in range(self._comparison_offsets[index], self._comparison_offsets[index + 1]):
+            took_left = bool(self._comparison_sides[w])
+            comparisons.append((left_index, right_index, took_left))
+            if took_left:
+                left_index += 1
+            else:
+                right_index += 1
+
+        first_part, last_part = self._part_offsets[index], self._part_offsets[index + 1]
+        parts = list(zip(self._part_starts[first_part:last_part], self._part_ends[first_part:last_part]))
+
+        return SortStep(
+            STEP_KINDS[self._kinds[index]],
+            (start, end),
+            self._depths[index],
+            self.writes_at(index),
+            comparisons,
+            self._comparison_counts[index],
+            parts,
+            index,
+        )
+
+    def next_position(self, kind, after, depth=None):
+        """
+        Finds the first step of a kind (optionally at a given recursion depth)
+        after a position, with a binary search over the positions of those steps.
+
+        Args:
+            kind (str): Step type to look for (one of STEP_KINDS)
+            after (int): Position to search after (-1 to search from the start)
+            depth (int, optional): Only match steps at this recursion depth
+
+        Returns:
+            int or None: Position of the matching step, or None if there is none
+        """
+
+        positions = self._positions.get((kind, depth), ())
+        found = bisect_right(positions, after)
+        return positions[found] if found < len(positions) else None
+
+    def next_merge(self, after, depth):
+        """
+        Finds the first merge at a recursion depth (0 is the final merge of
+        the whole array) after a position, whichever engine made the trace.
+        The parallel engine numbers its merge rounds the other way round (1 is
+        the first), so its "pass" steps are matched by how many rounds before
+        the last one they are.
+
+        Args:
+            after (int): Position to search after (-1 to search from the start)
+            depth (int): Recursion depth of the merge
+
+        Returns:
+            int or None: Position of the merge, or None if there is none
+        """
+
+        found = [self.next_position(kind, after, depth) for kind in ("merge", "kway_merge")]
+
+        passes = self._positions.get(("pass", None))
+        if passes:
+            last_round = self._depths[passes[-1]]
+            if depth < last_round:
+                found.append(self.next_position("pass", after, last_round - depth))
+
+        return min((position for position in found if position is not None), default=None)
+
+    def message_at(self, position, array):
+        """
+        Returns the message for a step, writing it the first time it is asked for.
+
+        Args:
+            position (int): A step index
+            array (list): The array as it looks at that position
+
+        Returns:
+            str: The message shown for the step
+        """
+
+        if position not in self._messages:
+            self._messages[position] = render_step_message(self[position], array)
+        return self._messages[position]
+
+    def writes_at(self, position):
+        """
+        Returns the writes made when moving onto a position.
+
+        Args:
+            position (int): A step index, or len(trace) for the finished position
+
+        Returns:
+            list: (index, old_value, new_value) tuples
+        """
+
+        first, last = self._write_offsets[position], self._write_offsets[position + 1]
+        return [
+            (self._write_indices[w], self._write_old[w], self._write_new[w])
+            for w in range(first, last)
+        ]
+
+    def writes_between(self, first, last):
+        """
+        Counts the writes made when moving from position first to position last (first <= last).
+        """
+
+        return self._write_offsets[last + 1] - self._write_offsets[first + 1]
+
+    def array_at(self, position):
+        """
+        Rebuilds the array as it looks at a position, starting from the nearest
+        earlier checkpoint and applying only the writes made since then.
+
+        Args:
+            position (int): -1 for the unsorted array, a step index, or len(trace) when finished
+
+        Returns:
+            list or numpy.ndarray: A new copy of the array at that position
+        """
+
+        position = max(-1, min(position, len(self)))
+        checkpoint = bisect_right(self._checkpoint_positions, position) - 1
+
+        rebuilt = working_copy(self._checkpoints[checkpoint])
+        first = self._write_offsets[self._checkpoint_positions[checkpoint] + 1]
+        last = self._write_offsets[position + 1]
+        for w in range(first, last):
+            rebuilt[self._write_indices[w]] = self._write_new[w]
+        return rebuilt
+
+
+class StepCursor:
+    """
+    This class tracks where a session is inside a StepTrace and keeps the array
+    as it looks at that position, applying or undoing one step's writes per move.
+
+    Attributes:
+        trace (StepTrace): The trace being stepped through
+        position (int): -1 before the first step, len(trace) once sorting is finished
+        array (list): The array as it looks at the current position
+    """
+
+    __slots__ = ("trace", "position", "array")
+
+    def __init__(self, trace):
+        self.trace = trace
+        self.position = -1
+        self.array = working_copy(trace.initial)
+
+    @property
+    def finished(self):
+        return self.position >= len(self.trace)
+
+    @property
+    def message(self):
+        """
+        The message for the current step (None before the first step or once finished).
+        """
+
+        if 0 <= self.position < len(self.trace):
+            return self.trace.message_at(self.position, self.array)
+        return None
+
+    def forward(self):
+        """
+        Moves one step forward.
+
+        Returns:
+            SortStep or None: The new current step, or None once sorting is finished
+        """
+
+        if self.finished:
+            return None
+        self.position += 1
+
+        for index, _, new in self.trace.writes_at(self.position):
+            self.array[index] = new
+        return None if self.finished else self.trace[self.position]
+
+    def back(self):
+        """
+        Moves one step backward.
+
+        Returns:
+            SortStep or None: The new current step, or None when back at the unsorted array
+        """
+
+        if self.position < 0:
+            return None
+
+        # undo the writes of the position we are leaving
+        for index, old, _ in self.trace.writes_at(self.position):
+            self.array[index] = old
+        self.position -= 1
+        return self.trace[self.position] if self.position >= 0 else None
+
+    def seek(self, position):
+        """
+        Moves to the given position, stepping through the writes in between
+        when there are few of them, or rebuilding from a checkpoint otherwise.
+
+        Args:
+            position (int): Target position (-1 to len(trace))
+
+        Returns:
+            SortStep or None: The step at the new position (None at either end)
+        """
+
+        position = max(-1, min(position, len(self.trace)))
+        first, last = sorted((self.position, position))
+
+        if self.trace.writes_between(first, last) > len(self.array):
+            self.array = self.trace.array_at(position)
+            self.position = position
+        while self.position < position:
+            self.forward()
+        while self.position > position:
+            self.back()
+        return self.trace[position] if 0 <= position < len(self.trace) else None
@@ -0,0 +1,62 @@
+"""
+Concurrency test for per-session state
+Drives hundreds of simulated sessions through the same handlers the UI calls
+(generate_random_array -> start_sorting -> next_step until sorted) at the same
+time, and checks that every session only ever sees its own array.
+Run with: python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+SESSIONS = 300
+WORKERS = 32
+ENGINES = ("recursive", "iterative", "kway")
+
+
+def run_session(number):
+    """
+    Sorts one session's array from start to finish, like a user clicking
+    Generate, Start Sorting and then Next Step until the array is sorted.
+
+    Returns:
+        tuple: (the session's generated array, its stepper once finished)
+    """
+
+    request = SimpleNamespace(session_hash=f"session-{number}") # stands in for gr.Request
+    length = 5 + number % 40 # lengths on both sides of the small/large value threshold
+
+    array, *_ = app.generate_random_array(str(length), "uniform", number)
+    generated = list(array)
+    stepper = app.start_sorting(array, ENGINES[number % len(ENGINES)], request)[0]
+
+    async def click_until_sorted():
+        while not stepper.finished:
+            await app.next_step(stepper, request)
+
+    asyncio.run(click_until_sorted())
+    return generated, array, stepper
+
+
+def test_sessions_only_see_their_own_array():
+    with ThreadPoolExecutor(WORKERS) as pool:
+        results = list(pool.map(run_session, range(SESSIONS)))
+
+    for number, (generated, array, stepper) in enumerate(results):
+        # the array is the one this session generated (same seed, same values) and was not changed by anyone
+        expected, *_ = app.generate_random_array(str(5 + number % 40), "uniform", number)
+        assert generated == expected
+        assert array == generated
+
+        # the session's trace was built from its own array, and it ends with that array sorted
+        assert list(stepper.trace.initial) == generated
+        assert list(stepper.array) == sorted(generated)
+        assert list(stepper.trace.final) == sorted(generated)
+
+    app.SESSION_CLICKS.clear()